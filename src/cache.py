@@ -0,0 +1,125 @@
+##################################################################################################################################################################################
+
+import numpy as np
+
+import hashlib
+import json
+import os
+import time
+from typing import Optional, Tuple
+
+from .sim.model import run, ENGINE_VERSION
+from .sim.particle import DETECTION_RECORD_DTYPE
+from .store import seed_to_json
+
+####################################################################################################################################################################################
+
+class RunCache:
+    """
+    Content-addressed on-disk cache of `run` results (detection record + lost count).
+
+    The key is a stable hash of (gen_/sen_ params, clock, run_duration, mode, seed, ENGINE_VERSION); a run
+    without a reproducible seed (gen_seed None or a Generator) is never cached. Entries live in `path` as
+    <key>.npy files listed in index.json with their size and last access time. When the total size exceeds
+    `max_bytes`, least recently used entries are evicted. Opening a cache written by another ENGINE_VERSION
+    drops all its entries.
+    """
+
+    INDEX = 'index.json'
+
+    def __init__(self, path: str, max_bytes: int = 1 << 30):
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        os.makedirs(path, exist_ok=True)
+        index_file = os.path.join(path, self.INDEX)
+        if os.path.exists(index_file):
+            with open(index_file, 'r') as f:
+                self.index = json.load(f)
+        else:
+            self.index = {'version': ENGINE_VERSION, 'entries': {}}
+        if self.index.get('version') != ENGINE_VERSION:
+            self.invalidate()
+
+    # keys - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    @staticmethod
+    def key(clock: float, run_duration: float, mode: str, params: dict) -> Optional[str]:
+        """Cache key of a run, or None when the run is not reproducible (no int/SeedSequence gen_seed)."""
+        params = dict(params)
+        seed = params.pop('gen_seed', None)
+        if seed is None or not isinstance(seed, (int, np.integer, np.random.SeedSequence)):
+            return None
+        content = {'clock': clock, 'run_duration': run_duration, 'mode': mode, 'seed': seed_to_json(seed),
+                   'params': params, 'engine_version': ENGINE_VERSION}
+        return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    # access - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def get(self, key: str) -> Optional[Tuple[np.ndarray, int]]:
+        """(record, lost_count) stored under key, or None."""
+        entry = self.index['entries'].get(key)
+        if entry is None:
+            return None
+        file = os.path.join(self.path, key + '.npy')
+        if not os.path.exists(file):  # removed behind our back
+            del self.index['entries'][key]
+            self._write_index()
+            return None
+        entry['last_access'] = time.time()
+        self._write_index()
+        return np.load(file), entry['lost']
+
+    def put(self, key: str, record: np.ndarray, lost: int):
+        """Store a run result, then evict least recently used entries above max_bytes."""
+        file = os.path.join(self.path, key + '.npy')
+        np.save(file, np.asarray(record, dtype=DETECTION_RECORD_DTYPE))
+        self.index['entries'][key] = {'size': os.path.getsize(file), 'lost': int(lost), 'last_access': time.time()}
+        self._evict()
+        self._write_index()
+
+    def run(self, clock=60, run_duration=10.0, mode: str = "analytic", **params) -> Tuple[np.ndarray, int]:
+        """Same as run(clock, run_duration, mode=mode, as_record=True, **params), served from the cache when possible."""
+        key = self.key(clock, run_duration, mode, params)
+        if key is not None:
+            hit = self.get(key)
+            if hit is not None:
+                return hit
+        record, lost = run(clock=clock, run_duration=run_duration, visualize=False, is_progressive=False,
+                           mode=mode, as_record=True, **params)
+        if key is not None:
+            self.put(key, record, lost)
+        return record, lost
+
+    # maintenance - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def size(self) -> int:
+        """Total size in bytes of the cached records."""
+        return sum(e['size'] for e in self.index['entries'].values())
+
+    def _evict(self):
+        entries = self.index['entries']
+        total = self.size()
+        for key in sorted(entries, key=lambda k: entries[k]['last_access']):
+            if total <= self.max_bytes:
+                break
+            total -= entries[key]['size']
+            self._remove(key)
+
+    def _remove(self, key: str):
+        self.index['entries'].pop(key, None)
+        file = os.path.join(self.path, key + '.npy')
+        if os.path.exists(file):
+            os.remove(file)
+
+    def invalidate(self):
+        """Drop every entry (e.g. after a change of the simulation code)."""
+        for key in list(self.index['entries']):
+            self._remove(key)
+        self.index = {'version': ENGINE_VERSION, 'entries': {}}
+        self._write_index()
+
+    def _write_index(self):
+        tmp = os.path.join(self.path, self.INDEX + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp, os.path.join(self.path, self.INDEX))
@@ -0,0 +1,166 @@
+##################################################################################################################################################################################
+
+import numpy as np
+
+from typing import Callable, List, Optional, Union
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from .sim.model import run
+from .sim.particle import Particle, particles_to_record
+from .estimators.LittleLaw import LittleLawEstimator, OccupancyEvents
+from .estimators.Linear import LinearEstimator
+from .estimators.geometrical import GeometricalEstimator
+from .estimators.InterArrival import InterArrivalEstimator
+from .estimators.Pipeline import RecordBatch, batch_estimate, estimate_emit_times
+from .store import CampaignStore
+
+####################################################################################################################################################################################
+
+def estimate_emit_time(p: Particle) -> float:
+    """ Estimate the emission time of a detected particle from its detection record. Requires that the particle has been detected.
+
+    WARNING : hypothesis on the mean position emission -> \\mathbb{E}(emission_position) = 0
+    """
+    if not p.detection_is_detected:
+        raise ValueError("Particle was not detected; cannot extract emission time.")
+    return p.detection_time - 1/3 * np.sum( p.position / p.velocity)
+
+
+def estimate_run(detected: Union[np.ndarray, List[Particle]], lost: Union[int, List[int]], params: dict, with_linear: bool = False) -> dict:
+    """
+    Per-run analysis of run.py: Little's law, geometrical and inter-arrival ("Unknown") rate estimates
+    (plus the Linear estimator when with_linear=True, which is much slower).
+    `detected` is a detection record (run(..., as_record=True)) or a list of detected Particle objects.
+    Returns a dict {estimator name: estimated rate}.
+    """
+    run_duration = params.get('run_duration', 10.0)
+    record = detected if isinstance(detected, np.ndarray) else particles_to_record(detected)
+
+    # little's Law Estimator - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    occupation = OccupancyEvents(record['detection_time'], record['detection_duration'], t_end=run_duration)
+    results = {'little_law': LittleLawEstimator()(occupation, record['detection_duration'])}
+
+    # Geometrical Estimator - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    sample_rate = len(record) / run_duration  # detected particles per second
+    results['geometrical'] = GeometricalEstimator()(sample_rate,
+                                                    emission_angle=params['gen_alpha'],
+                                                    emission_radius=params['gen_radius'],
+                                                    sensor_x_dimension=np.array(params['sen_dimensions']),
+                                                    sensor_x_position=params['sen_pos'][0])
+
+    # Unknown (inter-arrival) Estimator - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    est_emit_times = np.sort(estimate_emit_times(record))
+    results['unknown'] = InterArrivalEstimator()(est_emit_times) if len(est_emit_times) > 0 else np.nan
+
+    # Linear Estimator - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    if with_linear:
+        if len(est_emit_times) > 0:
+            best_m, _, _ = LinearEstimator()(est_emit_times, xmin=1, xmax=None, m_grid=None)
+            results['linear'] = 1 / best_m
+        else:
+            results['linear'] = np.nan
+
+    return results
+
+####################################################################################################################################################################################
+
+def _campaign_task(seed: np.random.SeedSequence, params: dict, estimate: Optional[Callable], run_kwargs: dict, keep_record: bool = False):
+    """One run of the campaign: simulate with its own random stream, then estimate."""
+    record, lost = run(clock=params.get('clock', 60),
+                       run_duration=params.get('run_duration', 10.0),
+                       visualize=False,
+                       is_progressive=False,
+                       as_record=True,
+                       gen_seed=seed,
+                       **run_kwargs,
+                       **{k: v for k, v in params.items() if k not in ('clock', 'run_duration')})
+    result = None if estimate is None else estimate(record, lost, params)
+    if keep_record:
+        return result, record, lost
+    return result
+
+
+def run_campaign(params: dict,
+                 nb_run: int,
+                 seed: Optional[int] = None,
+                 max_workers: Optional[int] = None,
+                 estimate: Optional[Callable] = estimate_run,
+                 chunksize: int = 1,
+                 store: Optional[CampaignStore] = None,
+                 progress: Optional[Callable[[int, int], None]] = None,
+                 **run_kwargs
+                 ) -> list:
+    """
+    Monte Carlo campaign: nb_run simulations of the sim_params.json configuration `params`,
+    each followed by `estimate(record, lost_count, params)`. Outputs are returned in run order.
+
+    Run i draws from the i-th child of np.random.SeedSequence(seed), so a given master seed gives
+    bit-identical results whatever the number of workers. max_workers=1 runs in the current process;
+    otherwise runs are spread over a process pool (`estimate` must then be picklable, i.e. defined at
+    module level or a functools.partial of such a function). Extra keyword arguments (e.g. mode="analytic")
+    are passed to `run`.
+
+    With a CampaignStore, every detection record is also appended to the store (in run order, with its
+    seed) so the campaign can be re-analysed later without re-simulating; estimate=None only stores.
+    `progress(done, nb_run)` is called each time a run completes (e.g. print_campaign_progress).
+    """
+    children = np.random.SeedSequence(seed).spawn(nb_run)
+    task = partial(_campaign_task, params=params, estimate=estimate, run_kwargs=run_kwargs, keep_record=store is not None)
+
+    if max_workers == 1:
+        outputs = map(task, children)
+        return _collect(outputs, children, store, progress)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return _collect(executor.map(task, children, chunksize=chunksize), children, store, progress)
+
+
+def _collect(outputs, children: list, store: Optional[CampaignStore], progress: Optional[Callable[[int, int], None]] = None) -> list:
+    """Gather the task outputs in run order, appending the records to the store if any."""
+    results = []
+    for done, (child, output) in enumerate(zip(children, outputs), start=1):
+        if store is not None:
+            result, record, lost = output
+            store.append_run(record, lost, seed=child)
+        else:
+            result = output
+        results.append(result)
+        if progress is not None:
+            progress(done, len(children))
+    if store is not None:
+        store.flush()
+    return results
+
+
+def print_campaign_progress(done: int, total: int):
+    """Default progress callback of run_campaign : a one-line progress bar over the runs, rewritten in place."""
+    bar_length = 30
+    percent = done / total
+    filled = int(percent * bar_length)
+    bar = "█" * filled + "-" * (bar_length - filled)
+    print(f"\rProgress: |{bar}| {percent*100:5.1f}%", end="" if done < total else "\n")
+
+
+def keep_record(record: np.ndarray, lost: int, params: dict):
+    """`estimate` of run_campaign returning the raw output of the run, (record, lost_count)."""
+    return record, lost
+
+
+def run_campaign_table(params: dict,
+                       nb_run: int,
+                       seed: Optional[int] = None,
+                       max_workers: Optional[int] = None,
+                       with_linear: bool = False,
+                       chunksize: int = 1,
+                       store: Optional[CampaignStore] = None,
+                       progress: Optional[Callable[[int, int], None]] = None,
+                       **run_kwargs
+                       ) -> np.ndarray:
+    """
+    `run_campaign` where the workers only simulate and all runs are estimated afterwards in one batch
+    (see estimators.Pipeline.batch_estimate). Returns the (nb_run,) table of estimates, in run order.
+    """
+    outputs = run_campaign(params, nb_run, seed=seed, max_workers=max_workers, estimate=keep_record,
+                           chunksize=chunksize, store=store, progress=progress, **run_kwargs)
+    batch = RecordBatch.from_records([record for record, _ in outputs], lost=[lost for _, lost in outputs])
+    return batch_estimate(batch, params, with_linear=with_linear)
@@ -0,0 +1,116 @@
+##################################################################################################################################################################################
+
+from . import *
+
+from typing import Callable, Tuple
+
+from .MLE import GaussianMLE
+from .LittleLaw import occupancy_intervals
+
+####################################################################################################################################################################################
+
+# Batched statistics : every column has shape (B, n) (one resample per row), the result has shape (B,)
+
+def little_law_statistic(detection_times: np.ndarray, detection_durations: np.ndarray, t_end: float) -> np.ndarray:
+    """LittleLawEstimator on OccupancyEvents over [0, t_end], for each row."""
+    entries, exits = occupancy_intervals(detection_times, detection_durations, t_end)
+    mean_occupation = np.sum(exits - entries, axis=-1) / t_end
+    with np.errstate(divide='ignore', invalid='ignore'):
+        residence_time = 1 / np.mean(1 / detection_durations, axis=-1)
+        return mean_occupation / residence_time
+
+
+def gaussian_mle_statistic(data: np.ndarray) -> np.ndarray:
+    """GaussianMLE (standard deviation, 1/n normalisation) for each row."""
+    return GaussianMLE()(data, axis=-1)
+
+
+def inter_arrival_statistic(gaps: np.ndarray) -> np.ndarray:
+    """InterArrivalEstimator for each row of inter-arrival gaps : 1 / mean gap."""
+    return 1 / np.mean(gaps, axis=-1)
+
+####################################################################################################################################################################################
+
+class Bootstrap:
+    """
+    Nonparametric bootstrap of an estimator on the detections of a single run.
+
+    The B resamples are (B, n) index matrices drawn with replacement and applied to every column at
+    once; the statistic is then evaluated on all the resamples of a chunk in one vectorized call.
+    Chunks hold at most `max_chunk_bytes` of resampled data, so memory does not grow with B.
+    """
+
+    def __init__(self, n_boot: int = 1000, confidence: float = 0.95, max_chunk_bytes: int = 1 << 26, seed=None):
+        """
+        Parameters:
+        n_boot : int
+            Number of resamples B.
+        confidence : float
+            Coverage of the percentile intervals.
+        max_chunk_bytes : int
+            Memory bound of the resampled columns of one chunk.
+        seed : None, int, SeedSequence or Generator
+            Random stream of the resampling indices.
+        """
+        if not 0 < confidence < 1:
+            raise ValueError("confidence must be in (0, 1).")
+        self.n_boot = int(n_boot)
+        self.confidence = float(confidence)
+        self.max_chunk_bytes = int(max_chunk_bytes)
+        self.rng = np.random.default_rng(seed)
+
+    def replicates(self, statistic: Callable[..., np.ndarray], *columns: np.ndarray, **kwargs) -> np.ndarray:
+        """
+        Values of `statistic(*resampled_columns, **kwargs)` on the B resamples, shape (B,).
+        Columns are 1-D arrays of the same length n (one entry per detection), resampled jointly.
+        """
+        columns = [np.asarray(c) for c in columns]
+        n = len(columns[0])
+        if n == 0:
+            raise ValueError("No detection to resample; cannot perform bootstrap.")
+        if any(len(c) != n for c in columns):
+            raise ValueError("All columns must have the same length.")
+        row_bytes = n * (8 + sum(c.itemsize for c in columns))  # indices + resampled columns
+        chunk = max(1, min(self.n_boot, self.max_chunk_bytes // row_bytes))
+
+        out = np.empty(self.n_boot)
+        for start in range(0, self.n_boot, chunk):
+            stop = min(start + chunk, self.n_boot)
+            idx = self.rng.integers(0, n, size=(stop - start, n))
+            out[start:stop] = statistic(*(c[idx] for c in columns), **kwargs)
+        return out
+
+    def interval(self, replicates: np.ndarray) -> Tuple[float, float]:
+        """Percentile interval of the replicates at the configured confidence (non-finite replicates ignored)."""
+        alpha = (1 - self.confidence) / 2
+        finite = replicates[np.isfinite(replicates)]
+        if len(finite) == 0:
+            return np.nan, np.nan
+        low, high = np.quantile(finite, [alpha, 1 - alpha])
+        return float(low), float(high)
+
+    def __call__(self, statistic: Callable[..., np.ndarray], *columns: np.ndarray, **kwargs) -> Tuple[float, float, float]:
+        """
+        (estimate, low, high) : the statistic on the original sample and its percentile bootstrap interval.
+        """
+        estimate = float(np.asarray(statistic(*(np.asarray(c)[np.newaxis, :] for c in columns), **kwargs))[0])
+        return (estimate,) + self.interval(self.replicates(statistic, *columns, **kwargs))
+
+    # ready-made intervals - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def little_law(self, detection_times: np.ndarray, detection_durations: np.ndarray, t_end: float) -> Tuple[float, float, float]:
+        """Little's law rate with its interval, detections resampled as (entry time, duration) pairs."""
+        return self(little_law_statistic, detection_times, detection_durations, t_end=t_end)
+
+    def gaussian_mle(self, data: np.ndarray) -> Tuple[float, float, float]:
+        """GaussianMLE standard deviation with its interval."""
+        return self(gaussian_mle_statistic, np.asarray(data, float).ravel())
+
+    def inter_arrival(self, arrival_times: np.ndarray, origin: float = 0.0) -> Tuple[float, float, float]:
+        """
+        Inter-arrival rate with its interval. The gaps between consecutive arrivals (and from origin to the first
+        one) are resampled, not the arrival times : the rate of resampled times only depends on their maximum,
+        which can never exceed the original one.
+        """
+        gaps = np.diff(np.sort(np.asarray(arrival_times, float).ravel()), prepend=origin)
+        return self(inter_arrival_statistic, gaps)
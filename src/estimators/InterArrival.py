@@ -0,0 +1,66 @@
+##################################################################################################################################################################################
+
+from . import *
+import numpy as np
+
+####################################################################################################################################################################################
+
+class InterArrivalEstimator:
+    """
+    **INTUITION** : \n
+    Rate = 1 / mean inter-arrival time, the gaps being measured between consecutive (estimated) emission
+    times and from the time origin to the first one.\n
+    The gaps telescope, so the mean gap only depends on the number of arrivals and the last arrival time:
+    this is what the online API keeps.
+    """
+
+    def __init__(self, origin: float = 0.0):
+        """
+        Initialize the InterArrivalEstimator.
+
+        Parameters:
+        origin : float
+            Time from which the first inter-arrival gap is measured.
+        """
+        self.origin = float(origin)
+        self.reset()
+
+    def __call__(self, arrival_times: np.ndarray) -> float:
+        """
+        Estimate the arrival rate from an array of arrival times (any order).
+        """
+        arrival_times = np.sort(np.asarray(arrival_times, float).ravel())
+        if len(arrival_times) == 0:
+            raise ValueError("Arrival array is empty; cannot perform estimation.")
+        gaps = np.diff(arrival_times, prepend=self.origin)
+        return 1 / np.mean(gaps)
+
+    # online estimation - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def reset(self) -> "InterArrivalEstimator":
+        """Clear the running statistics (number of arrivals and last arrival time)."""
+        self.n = 0
+        self.last_arrival = self.origin
+        return self
+
+    def partial_fit(self, arrival_times: np.ndarray) -> "InterArrivalEstimator":
+        """Update the running statistics with a chunk of arrival times. Chunks may come in any order."""
+        arrival_times = np.asarray(arrival_times, float).ravel()
+        if len(arrival_times) > 0:
+            self.n += len(arrival_times)
+            self.last_arrival = max(self.last_arrival, float(np.max(arrival_times)))
+        return self
+
+    def merge(self, other: "InterArrivalEstimator") -> "InterArrivalEstimator":
+        """Combine the running statistics of another estimator (same origin) into this one."""
+        if other.origin != self.origin:
+            raise ValueError("Cannot merge inter-arrival estimators with different origins.")
+        self.n += other.n
+        self.last_arrival = max(self.last_arrival, other.last_arrival)
+        return self
+
+    def estimate(self) -> float:
+        """Current rate estimate from the running statistics."""
+        if self.n == 0:
+            raise ValueError("No arrival seen yet; cannot perform estimation.")
+        return self.n / (self.last_arrival - self.origin)
@@ -2,6 +2,7 @@
 
 from . import *
 import numpy as np
+from scipy.optimize import minimize_scalar
 
 ####################################################################################################################################################################################
 
@@ -16,6 +17,22 @@ class LinearEstimator:
     2) for each m, computing the best integer sequence x via dynamic programming
     """
 
+    @staticmethod
+    def prefix_argmin(a, axis=-1):
+        """
+        Index of the (first) minimum of every prefix a[..., :j+1] along `axis`, without a Python loop.
+        An index k is the prefix argmin for all j >= k until a strictly smaller value appears, so the
+        answer is the last "record" index k <= j, with records where a[k] < min(a[:k]).
+        """
+        a = np.moveaxis(np.asarray(a, float), axis, -1)
+        V = a.shape[-1]
+        prefix_min = np.minimum.accumulate(a, axis=-1)
+        is_record = np.zeros(a.shape, dtype=bool)
+        is_record[..., 0] = True
+        is_record[..., 1:] = a[..., 1:] < prefix_min[..., :-1]
+        idx = np.where(is_record, np.arange(V), 0)
+        return np.moveaxis(np.maximum.accumulate(idx, axis=-1), -1, axis)
+
     @staticmethod
     def best_x_for_m_dp(y, m, xmin, xmax):
         """
@@ -45,12 +62,7 @@ class LinearEstimator:
             dp[1:] = cost_here[1:] + prefix_min[:-1]
 
             # argmin parents
-            argmins = np.zeros(V, dtype=int)
-            best_idx = 0
-            for j in range(1, V):
-                if dp_prev[j] < dp_prev[best_idx]:
-                    best_idx = j
-                argmins[j] = best_idx
+            argmins = LinearEstimator.prefix_argmin(dp_prev)
 
             parent = np.empty(V, dtype=int)
             parent[0] = -1
@@ -69,10 +81,101 @@ class LinearEstimator:
         return xs[x_idx], float(dp_prev[j])
 
     @staticmethod
-    def estimate_m_and_x_dp(y, xmin=1, xmax=None, m_grid=None):
+    def _banded_dp_pass(y, m, lo, hi):
+        """
+        One DP pass where layer i only considers x in [lo[i], hi[i]], with lo[i] >= lo[i-1] + 1 so that
+        every x of a layer has at least one admissible parent. Layers are kept instead of parents : the
+        parent of x_i is recovered at backtracking time as the (first) argmin of the previous layer up to x_i - 1.
+        Returns (x, cost).
+        """
+        n = len(y)
+        dp_prev = (y[0] - m * np.arange(lo[0], hi[0] + 1)) ** 2
+        layers = [dp_prev]
+
+        for i in range(1, n):
+            cost_here = (y[i] - m * np.arange(lo[i], hi[i] + 1)) ** 2
+            # best parent x' < x inside the previous window : prefix min of the previous layer
+            prefix_min = np.minimum.accumulate(dp_prev)
+            j = np.minimum(np.arange(lo[i] - 1, hi[i]), hi[i - 1]) - lo[i - 1]
+            dp_prev = cost_here + prefix_min[j]
+            layers.append(dp_prev)
+
+        # Backtracking
+        k = int(np.argmin(dp_prev))
+        x = np.empty(n, dtype=int)
+        x[-1] = lo[-1] + k
+        for i in range(n - 1, 0, -1):
+            last = min(x[i] - 1, hi[i - 1]) - lo[i - 1]
+            x[i - 1] = lo[i - 1] + int(np.argmin(layers[i - 1][:last + 1]))
+
+        return x, float(dp_prev[k])
+
+    @staticmethod
+    def best_x_for_m_dp_banded(y, m, xmin, xmax, band=8):
+        """
+        Banded version of `best_x_for_m_dp`: layer i only evaluates x within `band` of round(y_i / m),
+        clipped to the feasible range [xmin + i, xmax - (n-1-i)] and to the monotonicity constraint.
+        If the optimum touches a band edge, the band is doubled and the DP is run again, until the
+        optimum is strictly inside the band or the band covers [xmin, xmax].
+        Returns (x, cost). Complexity: O(n * band) per pass instead of O(n * (xmax-xmin)).
+        """
+        y = np.asarray(y, float)
+        n = len(y)
+        i = np.arange(n)
+        hard_lo = xmin + i  # strictly increasing integers starting at xmin
+        hard_hi = xmax - (n - 1 - i)  # ... and ending at xmax at most
+        centre = np.rint(y / m) if m != 0 else np.full(n, xmin)
+        centre = np.clip(np.nan_to_num(centre, nan=xmin), xmin, xmax).astype(int)
+
+        band = max(1, int(band))
+        while True:
+            # lower edges : lo_i = max(centre_i - band, xmin + i, lo_{i-1} + 1), via a running maximum
+            lo = np.maximum.accumulate(np.maximum(centre - band, hard_lo) - i) + i
+            hi = np.maximum(np.minimum(centre + band, hard_hi), lo)
+
+            x, cost = LinearEstimator._banded_dp_pass(y, m, lo, hi)
+
+            # band edges that are not implied by the feasibility / monotonicity constraints
+            prev_floor = np.concatenate([[xmin], lo[:-1] + 1])
+            soft_lo = lo > np.maximum(hard_lo, prev_floor)
+            soft_hi = hi < hard_hi
+            touching = np.any(((x == lo) & soft_lo) | ((x == hi) & soft_hi))
+            if not touching or band >= xmax - xmin:
+                return x, cost
+            band *= 2
+
+    @staticmethod
+    def best_cost_for_m_grid_dp(y, m_grid, xmin, xmax):
+        """
+        Forward pass of `best_x_for_m_dp` for every candidate m at once: the DP layer is an (M, V)
+        array advanced over the n observations. Only the final costs are needed to pick m, so no
+        parents are stored (memory O(M*V)). Element-wise operations are the same as in the single-m
+        DP, so the costs are bit-identical.
+        Returns the (M,) array of optimal costs.
+        """
+        y = np.asarray(y, float)
+        m = np.asarray(m_grid, float)[:, np.newaxis]  # (M, 1)
+        xs = np.arange(xmin, xmax + 1)[np.newaxis, :]  # (1, V)
+
+        dp_prev = (y[0] - m * xs) ** 2
+        for i in range(1, len(y)):
+            cost_here = (y[i] - m * xs) ** 2
+            prefix_min = np.minimum.accumulate(dp_prev, axis=1)
+            dp = np.empty_like(dp_prev)
+            dp[:, 0] = np.inf
+            dp[:, 1:] = cost_here[:, 1:] + prefix_min[:, :-1]
+            dp_prev = dp
+
+        return np.min(dp_prev, axis=1)
+
+    @staticmethod
+    def estimate_m_and_x_dp(y, xmin=1, xmax=None, m_grid=None, batched=True, banded=False):
         """
         Estimate m and the optimal integer sequence x using grid-search on m
         + dynamic programming for x for each tested m.
+        batched=True advances the DP for all m at once and only backtracks for the best m
+        (same result as the per-m loop, batched=False).
+        banded=True runs the per-m loop with `best_x_for_m_dp_banded` (long sequences).
         Returns (best_m, best_x, best_cost).
         """
         y = np.asarray(y, float)
@@ -85,17 +188,27 @@ class LinearEstimator:
             raise ValueError("xmax too small: must allow strictly increasing x values.")
 
         # Default m grid
-        ymax = max(1.0, np.max(np.abs(y)))
         if m_grid is None:
-            m_min = 1e-6
-            m_max = max(1.0, ymax / max(1, xmin))
-            m_grid = np.concatenate([
-                np.linspace(m_min, m_max, 50),
-                np.linspace(m_max, 3 * m_max, 30)
-            ])
+            m_grid = LinearEstimator.default_m_grid(y, xmin)
 
         best_m, best_x, best_cost = None, None, np.inf
 
+        if banded:
+            for m in m_grid:
+                x, cost = LinearEstimator.best_x_for_m_dp_banded(y, m, xmin, xmax)
+                if cost < best_cost:
+                    best_m, best_x, best_cost = m, x, cost
+            return best_m, best_x, best_cost
+
+        if batched:
+            costs = LinearEstimator.best_cost_for_m_grid_dp(y, m_grid, xmin, xmax)
+            costs = np.where(np.isnan(costs), np.inf, costs)
+            k = int(np.argmin(costs))  # first best m, as with the strict '<' of the loop
+            if costs[k] < best_cost:
+                best_m = m_grid[k]
+                best_x, best_cost = LinearEstimator.best_x_for_m_dp(y, best_m, xmin, xmax)
+            return best_m, best_x, best_cost
+
         for m in m_grid:
             x, cost = LinearEstimator.best_x_for_m_dp(y, m, xmin, xmax)
             if cost < best_cost:
@@ -103,12 +216,159 @@ class LinearEstimator:
 
         return best_m, best_x, best_cost
 
-    def __call__(self, y, xmin=1, xmax=None, m_grid=None):
+    @staticmethod
+    def estimate_m_and_x_search(y, xmin=1, xmax=None, m_bounds=None, n_coarse=16, tol=1e-6, max_iter=100, banded=False):
+        """
+        Estimate m and the optimal integer sequence x with an adaptive search on m instead of a fixed grid:
+        1) coarse scan of n_coarse log-spaced values of m merged with the `default_m_grid` values (only those
+           inside m_bounds when given), in one batched DP pass : cost(m) has many local minima, the dense linear
+           grid keeps the scan from missing the global basin, so the default result is never worse than
+           `estimate_m_and_x_dp`,
+        2) bracket the minimum of cost(m) between the neighbours of the best coarse value,
+        3) refine with bounded Brent iterations down to an absolute tolerance `tol` on m.
+        m_bounds defaults to [max|y| / (2 xmax), 3 max|y| / xmin]: x_n <= xmax bounds the slope from below.
+        banded=True evaluates cost(m) with `best_x_for_m_dp_banded` (long sequences).
+        Returns (best_m, best_x, best_cost, n_evals) where n_evals counts the DP evaluations of cost(m).
+        """
+        y = np.asarray(y, float)
+        n = len(y)
+
+        if xmax is None:
+            xmax = xmin + n + 50  # heuristic range
+
+        if xmax <= xmin + n - 1:
+            raise ValueError("xmax too small: must allow strictly increasing x values.")
+
+        # Default m range
+        m_grid = LinearEstimator.default_m_grid(y, xmin)
+        if m_bounds is None:
+            ymax = max(1e-12, np.max(np.abs(y)))
+            m_bounds = (ymax / (2 * xmax), 3 * ymax / max(1, xmin))
+        else:
+            m_grid = m_grid[(m_grid >= m_bounds[0]) & (m_grid <= m_bounds[1])]
+        if not 0 < m_bounds[0] < m_bounds[1]:
+            raise ValueError("m_bounds must satisfy 0 < m_min < m_max.")
+        if n_coarse < 3:
+            raise ValueError("n_coarse must be at least 3 to bracket a minimum.")
+
+        # 1) coarse scan
+        m_coarse = np.geomspace(m_bounds[0], m_bounds[1], n_coarse)
+        m_coarse = np.unique(np.concatenate([m_coarse, m_grid]))
+        if banded:
+            costs = np.array([LinearEstimator.best_x_for_m_dp_banded(y, m, xmin, xmax)[1] for m in m_coarse])
+        else:
+            costs = LinearEstimator.best_cost_for_m_grid_dp(y, m_coarse, xmin, xmax)
+        costs = np.where(np.isnan(costs), np.inf, costs)
+        n_evals = len(m_coarse)
+        k = int(np.argmin(costs))
+        best_m, best_cost = float(m_coarse[k]), float(costs[k])
+
+        # 2) bracket + 3) refine
+        lo, hi = m_coarse[max(k - 1, 0)], m_coarse[min(k + 1, len(m_coarse) - 1)]
+
+        def cost(m):
+            if banded:
+                return LinearEstimator.best_x_for_m_dp_banded(y, m, xmin, xmax)[1]
+            return float(LinearEstimator.best_cost_for_m_grid_dp(y, [m], xmin, xmax)[0])
+
+        res = minimize_scalar(cost, bounds=(lo, hi), method='bounded', options={'xatol': tol, 'maxiter': max_iter})
+        n_evals += int(res.nfev)
+        if res.fun < best_cost:
+            best_m, best_cost = float(res.x), float(res.fun)
+
+        if not np.isfinite(best_cost):
+            return None, None, np.inf, n_evals
+        if banded:
+            best_x, best_cost = LinearEstimator.best_x_for_m_dp_banded(y, best_m, xmin, xmax)
+        else:
+            best_x, best_cost = LinearEstimator.best_x_for_m_dp(y, best_m, xmin, xmax)
+        return best_m, best_x, best_cost, n_evals + 1
+
+    @staticmethod
+    def default_m_grid(y, xmin=1):
+        """
+        Default m grid of `estimate_m_and_x_dp` : 50 points up to m_max = max(1, max|y| / xmin), 30 more up to 3 m_max.
+        y may be an (R, n) array (NaN padded rows), then the grids are returned as an (R, 80) array.
+        """
+        y = np.asarray(y, float)
+        ymax = np.maximum(1.0, np.nanmax(np.abs(y), axis=-1, initial=0.0))
+        m_min = 1e-6
+        m_max = np.maximum(1.0, ymax / max(1, xmin))
+        return np.concatenate([
+            np.linspace(m_min, m_max, 50, axis=-1),
+            np.linspace(m_max, 3 * m_max, 30, axis=-1)
+        ], axis=-1)
+
+    @staticmethod
+    def estimate_m_batch(Y, lengths, xmin=1, max_chunk_bytes=1 << 18):
+        """
+        `estimate_m_and_x_dp` (default m grid and xmax) for R sequences at once, returning only best_m, shape (R,).
+        Y is an (R, n_max) array holding sequence r in Y[r, :lengths[r]]. Sequences are sorted by length and
+        processed in chunks of at most `max_chunk_bytes` of DP layer (small enough to stay in cache); the layer
+        of a chunk is a (C, M, V) array, V covering its largest x range. x beyond the xmax of a sequence costs
+        inf and the costs of a sequence are read once its last observation is reached, so they are bit-identical
+        to the per-sequence DP.
+        Empty sequences give NaN.
+        """
+        Y = np.asarray(Y, float)
+        lengths = np.asarray(lengths, np.int64)
+        best_m = np.full(len(Y), np.nan)
+        rows = np.flatnonzero(lengths > 0)
+        rows = rows[np.argsort(lengths[rows], kind='stable')]  # similar lengths share a chunk : little padding
+        if len(rows) == 0:
+            return best_m
+        Y = np.where(np.arange(Y.shape[1]) < lengths[:, np.newaxis], Y, np.nan)
+        m_grid = LinearEstimator.default_m_grid(Y, xmin)  # (R, M)
+        M = m_grid.shape[1]
+        xmax = xmin + lengths + 50  # heuristic range of estimate_m_and_x_dp
+
+        layer_bytes = 8 * M * (xmax[rows] - xmin + 1)  # non-decreasing along rows
+        start = 0
+        while start < len(rows):
+            # largest chunk whose layer, sized by its last (longest) sequence, fits in max_chunk_bytes
+            sizes = layer_bytes[start:] * np.arange(1, len(rows) - start + 1)
+            stop = start + max(1, int(np.searchsorted(sizes, max_chunk_bytes, side='right')))
+            r = rows[start:stop]
+            start = stop
+            n, V = lengths[r], int(xmax[r[-1]]) - xmin + 1
+            xs = np.arange(xmin, xmin + V)
+            mx = np.where(xs > xmax[r][:, np.newaxis, np.newaxis], -np.inf,  # beyond xmax : cost inf
+                          m_grid[r][:, :, np.newaxis] * xs)  # (C, M, V)
+            y = np.nan_to_num(Y[r])[:, :, np.newaxis, np.newaxis]
+            costs = np.empty((len(r), M))
+
+            # layers updated in place (no per-step allocation), same element-wise operations as the per-sequence DP
+            dp_prev = np.square(y[:, 0] - mx)
+            dp, cost_here, prefix_min = np.empty_like(mx), np.empty_like(mx), np.empty_like(mx)
+            dp[:, :, 0] = np.inf
+            for i in range(1, int(n.max()) + 1):
+                done = n == i  # last observation reached
+                if np.any(done):
+                    costs[done] = np.min(dp_prev[done], axis=2)
+                if i == n.max():
+                    break
+                np.square(np.subtract(y[:, i], mx, out=cost_here), out=cost_here)
+                np.minimum.accumulate(dp_prev, axis=2, out=prefix_min)
+                np.add(cost_here[:, :, 1:], prefix_min[:, :, :-1], out=dp[:, :, 1:])
+                dp, dp_prev = dp_prev, dp
+                dp[:, :, 0] = np.inf
+
+            costs = np.where(np.isnan(costs), np.inf, costs)
+            k = np.argmin(costs, axis=1)  # first best m, as in estimate_m_and_x_dp
+            found = np.isfinite(costs[np.arange(len(r)), k])
+            best_m[r[found]] = m_grid[r[found], k[found]]
+        return best_m
+
+    def __call__(self, y, xmin=1, xmax=None, m_grid=None, batched=True, banded=False, search=False, tol=1e-6):
         """
         Estimate m and the optimal integer sequence x using grid-search on m
         + dynamic programming for x for each tested m.
+        search=True refines m with `estimate_m_and_x_search` (down to `tol`) instead of a fixed grid;
+        m_grid and batched are then ignored.
         Returns (best_m, best_x, best_cost).
         """
-        return self.estimate_m_and_x_dp(y, xmin, xmax, m_grid)  
+        if search:
+            return self.estimate_m_and_x_search(y, xmin, xmax, tol=tol, banded=banded)[:3]
+        return self.estimate_m_and_x_dp(y, xmin, xmax, m_grid, batched, banded)  
     
 ####################################################################################################################################################################################
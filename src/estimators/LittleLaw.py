@@ -2,6 +2,86 @@
 
 from . import *
 
+from typing import Union
+
+####################################################################################################################################################################################
+
+def occupancy_intervals(entry_times: np.ndarray, durations: np.ndarray, t_end: float = np.inf, t_start: float = 0.0):
+    """
+    Detection intervals [entry, exit) clipped to the observation window [t_start, t_end] (arrays of any shape).
+    Returns (entries, exits); exits - entries is the contribution of each detection to the occupancy integral.
+    """
+    entries = np.clip(entry_times, t_start, t_end)
+    exits = np.clip(entry_times + durations, entries, t_end)
+    return entries, exits
+
+####################################################################################################################################################################################
+
+class OccupancyEvents:
+    """
+    Occupancy of the sensor stored as sorted entry / exit events instead of a dense per-sample array.
+    Each detection contributes +1 at its entry time and -1 at its exit time (entry + duration),
+    both clipped to the observation window [t_start, t_end].
+    """
+
+    def __init__(self, entry_times: np.ndarray, durations: np.ndarray, t_end: float, t_start: float = 0.0):
+        entry_times = np.asarray(entry_times, float).ravel()
+        durations = np.asarray(durations, float).ravel()
+        if entry_times.shape != durations.shape:
+            raise ValueError("entry_times and durations must have the same length.")
+        if not t_end > t_start:
+            raise ValueError("t_end must be greater than t_start.")
+        self.t_start = float(t_start)
+        self.t_end = float(t_end)
+        self.entries, self.exits = occupancy_intervals(entry_times, durations, self.t_end, self.t_start)
+
+        # sorted events (exits before entries at equal times, as intervals are [entry, exit))
+        times = np.concatenate([self.exits, self.entries])
+        deltas = np.concatenate([-np.ones(len(self.exits), int), np.ones(len(self.entries), int)])
+        order = np.argsort(times, kind='stable')
+        self.times = times[order]
+        self.deltas = deltas[order]
+        self._dense = {}  # fs -> materialised per-sample array
+
+    @classmethod
+    def from_particles(cls, particles, t_end: float, t_start: float = 0.0) -> "OccupancyEvents":
+        """Build the events from detected Particle objects (detection_time, detection_duration)."""
+        detected = [p for p in particles if p.detection_is_detected]
+        return cls([p.detection_time for p in detected], [p.detection_duration for p in detected], t_end, t_start)
+
+    @property
+    def duration(self) -> float:
+        return self.t_end - self.t_start
+
+    def levels(self) -> np.ndarray:
+        """Occupancy right after each event (step function on self.times)."""
+        return np.cumsum(self.deltas)
+
+    def integral(self) -> float:
+        """Exact time integral of the occupancy over [t_start, t_end]."""
+        if len(self.times) == 0:
+            return 0.0
+        return float(np.sum(self.levels()[:-1] * np.diff(self.times)))
+
+    def mean(self) -> float:
+        """Exact time-averaged occupancy over the observation window."""
+        return self.integral() / self.duration
+
+    def to_array(self, fs: float) -> np.ndarray:
+        """
+        Dense occupancy sampled at t_start + k/fs (k < duration*fs), built lazily with a diff array.
+        Same counting rule as the per-sample loop : entry <= t_k < exit.
+        """
+        fs = float(fs)
+        if fs not in self._dense:
+            n_samples = int(self.duration * fs)
+            first_in = np.ceil((self.entries - self.t_start) * fs).astype(int)  # first sample at or after entry
+            first_out = np.ceil((self.exits - self.t_start) * fs).astype(int)  # first sample at or after exit
+            diff = (np.bincount(np.clip(first_in, 0, n_samples), minlength=n_samples + 1)
+                    - np.bincount(np.clip(first_out, 0, n_samples), minlength=n_samples + 1))
+            self._dense[fs] = np.cumsum(diff)[:n_samples]
+        return self._dense[fs]
+
 ####################################################################################################################################################################################
 
 # Little's Law Estimator
@@ -23,11 +103,14 @@ class LittleLawEstimator:
         static_analysis : StaticAnalysisExtraction
             The static analysis data containing detection records.
         """
+        self.reset()
 
-    def mean_occupation(self , occupation_array : np.ndarray ) -> float:
+    def mean_occupation(self , occupation_array : Union[np.ndarray, OccupancyEvents] ) -> float:
         """
-        Estimate the mean occupation from an occupation array.
+        Estimate the mean occupation from an occupation array, or exactly from OccupancyEvents.
         """
+        if isinstance(occupation_array, OccupancyEvents):
+            return occupation_array.mean()
         return np.mean(occupation_array)
     
     def residence_time(self , residence_times : np.ndarray ) -> float:
@@ -36,8 +119,56 @@ class LittleLawEstimator:
         """
         return 1/np.mean(1/residence_times)
 
-    def __call__(self, occupation_array: np.ndarray, residence_times: np.ndarray) -> float:
+    def __call__(self, occupation_array: Union[np.ndarray, OccupancyEvents], residence_times: np.ndarray) -> float:
         """
         Estimate the average number of items in the system (L).
         """
-        return self.mean_occupation(occupation_array) / self.residence_time(residence_times)
\ No newline at end of file
+        return self.mean_occupation(occupation_array) / self.residence_time(residence_times)
+
+    # online estimation - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def reset(self) -> "LittleLawEstimator":
+        """
+        Clear the running sufficient statistics used by `partial_fit`:
+        count, time integral of the occupancy, sum of 1/residence and last exit time.
+        """
+        self.n = 0
+        self.occupancy_integral = 0.0
+        self.sum_inv_residence = 0.0
+        self.last_exit = 0.0
+        return self
+
+    def partial_fit(self, detection_times: np.ndarray, detection_durations: np.ndarray, t_end: float = None) -> "LittleLawEstimator":
+        """
+        Update the running statistics with a chunk of detections (entry times and durations).
+        Exits are clipped to t_end when the observation window is known in advance.
+        """
+        detection_times = np.asarray(detection_times, float).ravel()
+        detection_durations = np.asarray(detection_durations, float).ravel()
+        entries, exits = occupancy_intervals(detection_times, detection_durations, np.inf if t_end is None else t_end)
+        self.n += len(detection_times)
+        self.occupancy_integral += float(np.sum(exits - entries))
+        self.sum_inv_residence += float(np.sum(1 / detection_durations))
+        if len(exits) > 0:
+            self.last_exit = max(self.last_exit, float(np.max(exits)))
+        return self
+
+    def merge(self, other: "LittleLawEstimator") -> "LittleLawEstimator":
+        """Combine the running statistics of another estimator (e.g. fitted on other chunks) into this one."""
+        self.n += other.n
+        self.occupancy_integral += other.occupancy_integral
+        self.sum_inv_residence += other.sum_inv_residence
+        self.last_exit = max(self.last_exit, other.last_exit)
+        return self
+
+    def estimate(self, t_end: float = None) -> float:
+        """
+        Current rate estimate from the running statistics, over the window [0, t_end]
+        (defaults to the last exit seen so far).
+        """
+        if self.n == 0:
+            raise ValueError("No detection seen yet; cannot perform estimation.")
+        t_end = self.last_exit if t_end is None else t_end
+        mean_occupation = self.occupancy_integral / t_end
+        residence_time = self.n / self.sum_inv_residence
+        return mean_occupation / residence_time
@@ -3,6 +3,8 @@
 from . import *
 import numpy as np
 
+from typing import Optional, Tuple, Union
+
 ####################################################################################################################################################################################
 
 
@@ -15,23 +17,107 @@ class GaussianMLE:
         """
         Initialize the GaussianMLE.
         """
+        self.reset()
 
-    def __call__(self, data: np.ndarray) -> float:
+    def __call__(self, data: np.ndarray, axis: Optional[int] = None) -> Union[float, np.ndarray]:
         """
         Estimate the scale parameter (standard deviation) of the Gaussian distribution from the data.
 
         Parameters:
         data : np.ndarray
-            The observed data samples.
+            The observed data samples. NaN entries are ignored, so ragged samples can be given as
+            NaN-padded rows.
+        axis : int or None
+            None : one estimate from all the samples. Otherwise one estimate per slice along `axis`
+            (e.g. axis=1 on an (R, n) array : one estimate per run, NaN for empty rows).
 
         Returns:
-        float
+        float or np.ndarray
             The estimated scale parameter (standard deviation).
         """
+        count, _, M2 = self.moments(data, axis)
+        if axis is None:
+            if count == 0:
+                raise ValueError("Data array is empty; cannot perform estimation.")
+            return np.sqrt(M2 / count)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.sqrt(M2 / count)
+
+    @staticmethod
+    def moments(data: np.ndarray, axis: Optional[int] = None) -> Tuple[Union[int, np.ndarray], Union[float, np.ndarray], Union[float, np.ndarray]]:
+        """
+        Two-pass (count, mean, M2 = sum of squared deviations) of the non-NaN samples, along `axis`
+        (all samples when None). This is the mergeable state of the online API.
+        """
         data = np.asarray(data, float)
-        n = len(data)
-        if n == 0:
-            raise ValueError("Data array is empty; cannot perform estimation.")
-        mean = np.mean(data)
-        variance = np.sum((data - mean) ** 2) / n
-        return np.sqrt(variance)
\ No newline at end of file
+        if axis is None:
+            data = data.ravel()
+            axis = 0
+        valid = ~np.isnan(data)
+        count = np.sum(valid, axis=axis)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = np.sum(np.where(valid, data, 0.0), axis=axis) / count
+            M2 = np.sum(np.where(valid, data - np.expand_dims(mean, axis), 0.0) ** 2, axis=axis)
+        mean = np.where(count > 0, mean, 0.0)
+        if np.ndim(count) == 0:
+            return int(count), float(mean), float(M2)
+        return count, mean, M2
+
+    # online estimation - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def reset(self) -> "GaussianMLE":
+        """Clear the running Welford state (count, mean, M2 = sum of squared deviations)."""
+        self.count = 0
+        self.mean = 0.0
+        self.M2 = 0.0
+        return self
+
+    @property
+    def state(self) -> tuple:
+        """Running state (count, mean, M2) : scalars, or arrays after a partial_fit along an axis."""
+        return self.count, self.mean, self.M2
+
+    @classmethod
+    def from_state(cls, count, mean, M2) -> "GaussianMLE":
+        """GaussianMLE resuming from a state (e.g. computed by a worker and sent back instead of its data)."""
+        return cls()._combine(count, mean, M2)
+
+    def _combine(self, count, mean, M2) -> "GaussianMLE":
+        # parallel Welford update (Chan et al.), element-wise for array states
+        if np.ndim(count) == 0 and np.ndim(self.count) == 0:
+            if count == 0:
+                return self
+            total = self.count + count
+            delta = mean - self.mean
+            self.mean += delta * count / total
+            self.M2 += M2 + delta ** 2 * self.count * count / total
+            self.count = total
+            return self
+        count = np.asarray(count)
+        total = self.count + count
+        weight = count / np.maximum(total, 1)
+        delta = np.where(count > 0, mean - self.mean, 0.0)
+        self.mean = self.mean + delta * weight
+        self.M2 = self.M2 + np.where(count > 0, M2, 0.0) + delta ** 2 * self.count * weight
+        self.count = total
+        return self
+
+    def partial_fit(self, data: np.ndarray, axis: Optional[int] = None) -> "GaussianMLE":
+        """
+        Update the running state with a chunk of samples (NaN ignored). With an axis, the state holds
+        one (count, mean, M2) per slice, e.g. one per run for (R, n) chunks and axis=1.
+        """
+        return self._combine(*self.moments(data, axis))
+
+    def merge(self, other: "GaussianMLE") -> "GaussianMLE":
+        """Combine the running state of another GaussianMLE (e.g. fitted on other chunks) into this one."""
+        return self._combine(other.count, other.mean, other.M2)
+
+    def estimate(self) -> Union[float, np.ndarray]:
+        """Current estimate of the standard deviation from the running state (NaN for empty slices)."""
+        if np.ndim(self.count) == 0:
+            if self.count == 0:
+                raise ValueError("No data seen yet; cannot perform estimation.")
+            return np.sqrt(self.M2 / self.count)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.sqrt(self.M2 / self.count)
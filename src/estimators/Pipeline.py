@@ -0,0 +1,144 @@
+##################################################################################################################################################################################
+
+from . import *
+
+from typing import Iterator, List, Optional, Sequence
+
+from ..sim.particle import DETECTION_RECORD_DTYPE
+from .geometrical import GeometricalEstimator
+from .Linear import LinearEstimator
+from .LittleLaw import occupancy_intervals
+
+####################################################################################################################################################################################
+
+def estimate_emit_times(record: np.ndarray) -> np.ndarray:
+    """ Emission time of every detection of a record (DETECTION_RECORD_DTYPE), column-wise.
+
+    WARNING : hypothesis on the mean position emission -> \\mathbb{E}(emission_position) = 0
+    """
+    return record['detection_time'] - 1/3 * np.sum(record['position'] / record['velocity'], axis=1)
+
+####################################################################################################################################################################################
+
+class RecordBatch:
+    """
+    Detection records of R runs in a ragged layout : one flat record sorted by run, the run index of
+    every row and the row offsets of every run. Per-run statistics are segment reductions
+    (np.bincount / ufunc.reduceat) over the flat columns, so R runs cost a few NumPy passes.
+    """
+
+    def __init__(self, record: np.ndarray, run_ids: np.ndarray, n_runs: int, lost: Optional[Sequence[int]] = None):
+        run_ids = np.asarray(run_ids, np.int64)
+        if len(run_ids) != len(record):
+            raise ValueError("record and run_ids must have the same length.")
+        if np.any(run_ids[1:] < run_ids[:-1]):
+            order = np.argsort(run_ids, kind='stable')
+            record, run_ids = record[order], run_ids[order]
+        self.record = record  # a view when already sorted by run (e.g. a memory-mapped store chunk)
+        self.run_ids = run_ids
+        self.n_runs = int(n_runs)
+        self.counts = np.bincount(self.run_ids, minlength=self.n_runs)
+        self.offsets = np.concatenate([[0], np.cumsum(self.counts)])
+        self.lost = None if lost is None else np.asarray(lost, np.int64)
+
+    @classmethod
+    def from_records(cls, records: List[np.ndarray], lost: Optional[Sequence[int]] = None) -> "RecordBatch":
+        """Batch of the records returned by run(..., as_record=True), one per run."""
+        run_ids = np.repeat(np.arange(len(records)), [len(r) for r in records])
+        return cls(np.concatenate(records), run_ids, len(records), lost)
+
+    @classmethod
+    def iter_store(cls, store) -> Iterator["RecordBatch"]:
+        """
+        One batch per chunk of a CampaignStore, in run order. A run never spans two chunks, so per-run
+        results can be computed chunk by chunk; each batch is a view on the memory-mapped chunk.
+        """
+        runs = store.index['runs'][:len(store)]
+        for k, chunk in enumerate(store.iter_chunks()):
+            entries = [r for r in runs if r['chunk'] == k]
+            run_ids = np.repeat(np.arange(len(entries)), [r['count'] for r in entries])
+            yield cls(chunk, run_ids, len(entries), [r['lost'] for r in entries])
+
+    def __len__(self):
+        return self.n_runs
+
+    def run(self, i: int) -> np.ndarray:
+        """Record of run i (a view)."""
+        return self.record[self.offsets[i]:self.offsets[i + 1]]
+
+    def segment_sum(self, values: np.ndarray) -> np.ndarray:
+        """Per-run sum of a per-row array, shape (R,)."""
+        return np.bincount(self.run_ids, weights=values, minlength=self.n_runs)
+
+    def segment_max(self, values: np.ndarray, empty: float = np.nan) -> np.ndarray:
+        """Per-run max of a per-row array, `empty` for runs without detection, shape (R,)."""
+        out = np.full(self.n_runs, empty, float)
+        filled = self.counts > 0
+        if np.any(filled):
+            out[filled] = np.maximum.reduceat(values, self.offsets[:-1][filled])
+        return out
+
+    def padded(self, field: str, fill: float = np.nan) -> np.ndarray:
+        """Column `field` as an (R, max detections, ...) array, runs padded with `fill`."""
+        return self.pad(self.record[field], fill)
+
+    def pad(self, column: np.ndarray, fill: float = np.nan) -> np.ndarray:
+        """Per-row array (aligned with the record) as an (R, max detections, ...) array, runs padded with `fill`."""
+        out = np.full((self.n_runs, int(self.counts.max(initial=0))) + column.shape[1:], fill, float)
+        out[self.run_ids, np.arange(len(column)) - self.offsets[self.run_ids]] = column
+        return out
+
+####################################################################################################################################################################################
+
+def batch_estimate(batch: RecordBatch, params: dict, with_linear: bool = False) -> np.ndarray:
+    """
+    `estimate_run` for the R runs of a batch at once.
+    Returns an (R,) structured array with one float column per estimator (little_law, geometrical,
+    unknown and, with with_linear=True, linear); runs without detection get NaN.
+    Little's law, geometrical and inter-arrival estimates are closed-form segment reductions; the Linear
+    estimator runs its DP for all runs at once on the padded (R, max detections) emission times
+    (LinearEstimator.estimate_m_batch).
+    """
+    run_duration = params.get('run_duration', 10.0)
+    record = batch.record
+    counts = batch.counts
+    names = ['little_law', 'geometrical', 'unknown'] + (['linear'] if with_linear else [])
+    table = np.full(len(batch), np.nan, dtype=[(name, float) for name in names])
+    detected = counts > 0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # little's Law Estimator : exact occupancy integral (sum of the clipped detection intervals)
+        entries, exits = occupancy_intervals(record['detection_time'], record['detection_duration'], run_duration)
+        mean_occupation = batch.segment_sum(exits - entries) / run_duration
+        residence_time = counts / batch.segment_sum(1 / record['detection_duration'])
+        table['little_law'][detected] = (mean_occupation / residence_time)[detected]
+
+        # Unknown (inter-arrival) Estimator : gaps from 0 telescope to the last emission time
+        last_emission = batch.segment_max(estimate_emit_times(record))
+        table['unknown'][detected] = (counts / last_emission)[detected]
+
+    # Geometrical Estimator (same geometry for every run)
+    table['geometrical'] = GeometricalEstimator()(counts / run_duration,
+                                                  emission_angle=params['gen_alpha'],
+                                                  emission_radius=params['gen_radius'],
+                                                  sensor_x_dimension=np.array(params['sen_dimensions']),
+                                                  sensor_x_position=params['sen_pos'][0])
+
+    # Linear Estimator
+    if with_linear:
+        emit_times = np.sort(batch.pad(estimate_emit_times(record)), axis=1)  # NaN padding sorts last
+        table['linear'] = 1 / LinearEstimator.estimate_m_batch(emit_times, counts, xmin=1)
+
+    return table
+
+
+def batch_estimate_store(store, params: Optional[dict] = None, with_linear: bool = False) -> np.ndarray:
+    """
+    `batch_estimate` for every run of a CampaignStore (params default to the store's), chunk after chunk :
+    only one memory-mapped chunk is scanned at a time and only the per-run tables are concatenated.
+    """
+    params = store.params if params is None else params
+    tables = [batch_estimate(batch, params, with_linear=with_linear) for batch in RecordBatch.iter_store(store)]
+    if not tables:
+        return batch_estimate(RecordBatch(np.empty(0, dtype=DETECTION_RECORD_DTYPE), [], 0), params, with_linear=with_linear)
+    return np.concatenate(tables)
@@ -20,21 +20,43 @@ class GeometricalEstimator:
         """Volume of the cone of angle alpha and height v."""
         return (1/3) * np.pi *( (v * np.tan(np.deg2rad(alpha)))**2 )* v
 
-    def __call__(self, estimed_rate:float , emission_angle:float , emission_radius : float , sensor_x_dimension :np.ndarray , sensor_x_position:float ) -> float:
+    @classmethod
+    def volume_ratio(cls, emission_angle, emission_radius, sensor_x_dimension, sensor_x_position) -> np.ndarray:
+        """
+        Ratio (volume of the emission cone slice spanned by the sensor along x) / (sensor volume).
+        Every argument broadcasts : angles, radii and positions are arrays of any compatible shapes and
+        sensor_x_dimension is a (..., 3) stack of (width, depth, height) vectors.
+        """
+        emission_angle = np.asarray(emission_angle, float)
+        emission_radius = np.asarray(emission_radius, float)
+        sensor_x_dimension = np.asarray(sensor_x_dimension, float)
+        sensor_x_position = np.asarray(sensor_x_position, float)
+        width, depth, height = sensor_x_dimension[..., 0], sensor_x_dimension[..., 1], sensor_x_dimension[..., 2]
+        apex_offset = emission_radius / np.tan(np.deg2rad(emission_angle))  # generator disk -> cone apex
+        V_total = (cls.Vcone(emission_angle, sensor_x_position + width/2 + apex_offset) -
+                   cls.Vcone(emission_angle, sensor_x_position - width/2 + apex_offset))
+        return V_total / (width * depth * height)
+
+    def __call__(self, estimed_rate , emission_angle=None , emission_radius=None , sensor_x_dimension=None , sensor_x_position=None ,
+                 volume_ratio=None):
         """
         Estimate the average scale parameter based on geometrical considerations.
 
         Parameters:
-        positions : np.ndarray
-            The observed positions of the particles.
-        velocities : np.ndarray
-            The observed velocities of the particles.
+        estimed_rate : float or np.ndarray
+            The detection rate(s) (detected particles per second).
+        emission_angle, emission_radius, sensor_x_position : float or np.ndarray
+            Generator cone half-angle (degrees), generator radius and sensor center x.
+        sensor_x_dimension : np.ndarray
+            Sensor (width, depth, height), or a (..., 3) stack of them.
+        volume_ratio : np.ndarray, optional
+            Precomputed `volume_ratio(...)` of the geometry grid; the geometry arguments are then not needed,
+            so repeated sweeps over the same grid skip the cone volumes.
 
         Returns:
-        float
-            The estimated scale parameter.
+        float or np.ndarray
+            The estimated emission rate, broadcast over all the inputs.
         """
-        V_total =  (self.Vcone( emission_angle , sensor_x_position + sensor_x_dimension[0]/2 + emission_radius/np.tan( np.deg2rad(emission_angle) ) ) - 
-                    self.Vcone( emission_angle , sensor_x_position - sensor_x_dimension[0]/2 + emission_radius/np.tan( np.deg2rad(emission_angle) ) )
-                    ) 
-        return estimed_rate * (V_total / ( sensor_x_dimension[0] * sensor_x_dimension[1] * sensor_x_dimension[2] ))
+        if volume_ratio is None:
+            volume_ratio = self.volume_ratio(emission_angle, emission_radius, sensor_x_dimension, sensor_x_position)
+        return estimed_rate * volume_ratio
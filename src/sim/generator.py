@@ -1,7 +1,9 @@
 # imports :
 
 from . import *  # imports globaux
+from scipy.stats import qmc
 from .particle import Particle
+from .sampling import InverseCDF
 
 ###########################################################################################################
 
@@ -27,8 +29,23 @@ class GeneratorCircle:
                  vel_dir_dist_params=None, # velocity direction distribution parameters
 
                  emit_dist_type='constant', # emission time distribution type
-                 emit_dist_params={'value': 0.5} # emission time distribution parameters
+                 emit_dist_params={'value': 0.5}, # emission time distribution parameters
+
+                 seed=None, # random stream : None (global np.random state), int, SeedSequence or Generator
+                 qmc=None, # None (pseudo-random) or 'sobol' / 'halton' : scrambled low-discrepancy blocks
+                 table_size=2048 # resolution of the tabulated inverse CDFs (None : generic SciPy rvs draws)
             ):     
+        # --- random stream --------------------------------------------------------
+        # self.rng is either the np.random module (legacy global state) or a private np.random.Generator;
+        # self.random_state is what the SciPy distributions receive (None means global state).
+        self.random_state = None if seed is None else np.random.default_rng(seed)
+        self.rng = np.random if seed is None else self.random_state
+        if qmc not in (None, 'sobol', 'halton'):
+            raise ValueError(f"Unknown QMC sequence : {qmc}")
+        self.qmc = qmc
+        self._qmc_engine = None  # built on first use, scrambled from the random stream
+        self.table_size = None if table_size is None else int(table_size)
+        self._theta_ppf = {}  # (mu, sigma) -> inverse CDF of the truncnorm cone angle
         # --- geometric parameters -------------------------------------------------
         self.radius = float(radius)
         self.alpha = float(alpha)  # degrees
@@ -40,8 +57,34 @@ class GeneratorCircle:
         self.vel_dir_distribution_params = self._build_velocity_direction_distribution(vel_dir_dist_type , vel_dir_dist_params)
         # --- emission time distribution -------------------------------------------
         self._build_emit_distribution(emit_dist_type, emit_dist_params)
+        # --- inverse CDFs compiled once (block draws are then lookups on uniforms) ---
+        self.emit_ppf = None if self.emit_distribution is None else self._inverse_cdf(self.emit_distribution)
+        self.vel_norm_ppf = None if self.vel_norm_distribution is None else self._inverse_cdf(self.vel_norm_distribution)
+
+        self.time_since_last_emit = 0.0
 
+    def reseed(self, seed=None) -> "GeneratorCircle":
+        """Switch to a new random stream, keeping the frozen distributions (reuse across replicates)."""
+        self.random_state = None if seed is None else np.random.default_rng(seed)
+        self.rng = np.random if seed is None else self.random_state
+        self._qmc_engine = None  # new scrambling for the new replicate
         self.time_since_last_emit = 0.0
+        if hasattr(self, '_next_emit_delay'):
+            del self._next_emit_delay
+        return self
+
+    def _inverse_cdf(self, distribution):
+        """Quantile function of a frozen distribution : InverseCDF (closed form or table) when table_size is set
+        and the distribution is continuous, its exact ppf otherwise."""
+        if self.table_size is None or isinstance(distribution.dist, stats.rv_discrete):
+            return distribution.ppf
+        return InverseCDF(distribution, self.table_size)
+
+    def _position_u(self, u: np.ndarray) -> np.ndarray:
+        """cdf(ppf(u)) of the position distribution : the identity for a continuous distribution."""
+        if isinstance(self.pos_distribution.dist, stats.rv_discrete):
+            return np.clip(self.pos_distribution.cdf(self.pos_distribution.ppf(u)), 0.0, 1.0)
+        return u
 
     ### building distributions # # # # # # # # # # # # # # # # # # # # # # # # # # 
 
@@ -69,50 +112,62 @@ class GeneratorCircle:
         dist_class = getattr(stats, vel_norm_dist_type)
         self.vel_norm_distribution = dist_class(**vel_norm_dist_params)
 
-    def _dist_vel_direction_uniform_cone(self):
+    def _dist_vel_direction_uniform_cone(self, size=None, uniforms=None):
         # cos(theta) uniforme dans [cos(alpha), 1]
         alpha_rad = np.deg2rad(self.alpha)
-        u = np.random.uniform(np.cos(alpha_rad), 1.0)
+        if uniforms is None:
+            u = self.rng.uniform(np.cos(alpha_rad), 1.0, size)
+            phi_u = self.rng.random(size)
+        else:  # inverse CDF of given (size, 2) uniforms
+            u = np.cos(alpha_rad) + (1.0 - np.cos(alpha_rad)) * uniforms[:, 0]
+            phi_u = uniforms[:, 1]
         theta = np.arccos(u)
         # phi uniforme dans [0, 2pi]
-        phi = 2 * np.pi * np.random.rand()
+        phi = 2 * np.pi * phi_u
 
-        # direction dans repère x-y-z
+        # direction dans repère x-y-z : (3,) si size est None, (size, 3) sinon
         dx = u
         dy = np.sin(theta) * np.cos(phi)
         dz = np.sin(theta) * np.sin(phi)
 
-        return np.array([dx, dy, dz])
+        return np.stack([dx, dy, dz], axis=-1)
     
-    def _dist_vel_driection_truncnorm_cone(self,loc=None,scale=None):
+    def _dist_vel_driection_truncnorm_cone(self,loc=None,scale=None,size=None,uniforms=None):
         # truncated normal distribution for theta within [0, alpha]
         alpha_rad = np.deg2rad(self.alpha)
         mu = alpha_rad / 2  if loc is None else loc  # mean at half the cone angle
         sigma = alpha_rad / 6  if scale is None else scale  # standard deviation
 
         a, b = (0 - mu) / sigma, (alpha_rad - mu) / sigma
-        theta = stats.truncnorm.rvs(a, b, loc=mu, scale=sigma)
+        if uniforms is None:
+            theta = stats.truncnorm.rvs(a, b, loc=mu, scale=sigma, size=size, random_state=self.random_state)
+            phi_u = self.rng.random(size)
+        else:  # inverse CDF of given (size, 2) uniforms, compiled once per (mu, sigma)
+            if (mu, sigma) not in self._theta_ppf:
+                self._theta_ppf[(mu, sigma)] = self._inverse_cdf(stats.truncnorm(a, b, loc=mu, scale=sigma))
+            theta = self._theta_ppf[(mu, sigma)](uniforms[:, 0])
+            phi_u = uniforms[:, 1]
 
         # phi uniforme dans [0, 2pi]
-        phi = 2 * np.pi * np.random.rand()
+        phi = 2 * np.pi * phi_u
 
-        # direction dans repère x-y-z
+        # direction dans repère x-y-z : (3,) si size est None, (size, 3) sinon
         dx = np.cos(theta)
         dy = np.sin(theta) * np.cos(phi)
         dz = np.sin(theta) * np.sin(phi)
 
-        return np.array([dx, dy, dz])
+        return np.stack([dx, dy, dz], axis=-1)
 
 
     def _build_velocity_direction_distribution(self , vel_dir_dist_type, vel_dir_dist_params=None):
         if vel_dir_dist_type == 'uniform_cone':
-            # return a sampler (callable) that draws one direction when called
+            # return a sampler (callable) that draws one direction when called, or `size` directions
             return self._dist_vel_direction_uniform_cone
         elif vel_dir_dist_type == 'truncnorm_cone':
             if vel_dir_dist_params is None:
                 return self._dist_vel_driection_truncnorm_cone
             else:
-                return lambda: self._dist_vel_driection_truncnorm_cone(loc=vel_dir_dist_params.get('loc'), scale=vel_dir_dist_params.get('scale'))
+                return lambda size=None, uniforms=None: self._dist_vel_driection_truncnorm_cone(loc=vel_dir_dist_params.get('loc'), scale=vel_dir_dist_params.get('scale'), size=size, uniforms=uniforms)
         else:
             raise ValueError(f"Distribution angulaire inconnue : {vel_dir_dist_type}")
     
@@ -143,7 +198,7 @@ class GeneratorCircle:
             if self.emit_distribution is None:
                 self._next_emit_delay = float(self.constant_emit_delay)
             else:
-                self._next_emit_delay = float(self.emit_distribution.rvs())
+                self._next_emit_delay = float(self.emit_distribution.rvs(random_state=self.random_state))
 
         # not yet time to emit
         if self.time_since_last_emit < self._next_emit_delay:
@@ -153,11 +208,11 @@ class GeneratorCircle:
         try:
             # --- sample position on the circular emission surface ---
             # radial sample: draw raw value from distribution, map to area-uniform via sqrt(CDF)
-            raw_r = self.pos_distribution.rvs()
+            raw_r = self.pos_distribution.rvs(random_state=self.random_state)
             u = self.pos_distribution.cdf(raw_r)
             u = np.clip(u, 0.0, 1.0)
             r = self.radius * np.sqrt(u)
-            theta = 2 * np.pi * np.random.rand()
+            theta = 2 * np.pi * self.rng.random()
             # emission surface lies in local y-z plane, x=0 (same convention as other generators)
             position = np.array([0.0, r * np.cos(theta), r * np.sin(theta)])
 
@@ -165,7 +220,7 @@ class GeneratorCircle:
             if self.vel_norm_distribution is None:
                 speed = self.constant_speed
             else:
-                speed = float(self.vel_norm_distribution.rvs())
+                speed = float(self.vel_norm_distribution.rvs(random_state=self.random_state))
 
             # --- velocity direction ---
             if callable(self.vel_dir_distribution_params):
@@ -192,8 +247,149 @@ class GeneratorCircle:
         if self.emit_distribution is None:
             self._next_emit_delay = float(self.constant_emit_delay)
         else:
-            self._next_emit_delay = float(self.emit_distribution.rvs())
+            self._next_emit_delay = float(self.emit_distribution.rvs(random_state=self.random_state))
 
         return particle
 
-        
\ No newline at end of file
+        
+
+    # block emission - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def sample_block(self, n: int):
+        """
+        Draw n emissions at once with a handful of vectorized rvs(size=n) calls.
+        Returns (emission_times, positions, velocities) with shapes (n,), (n, 3), (n, 3).
+        Emission times are the cumulative sum of the n emission delays (the block starts at t=0).
+        With table_size set, every quantity is the inverse CDF (see `_inverse_cdf`) of one column of an
+        (n, QMC_DIMENSIONS) array of uniforms; with qmc set, these uniforms are the next n points of a
+        scrambled Sobol / Halton sequence instead of pseudo-random draws.
+        """
+        n = int(n)
+        if self.qmc is not None:
+            return self._sample_block_uniforms(self.qmc_uniforms(n))
+        if self.table_size is not None:
+            return self._sample_block_uniforms(self.rng.random((n, self.QMC_DIMENSIONS)))
+        # --- emission delays ---
+        if self.emit_distribution is None:
+            delays = np.full(n, self.constant_emit_delay)
+        else:
+            delays = np.asarray(self.emit_distribution.rvs(size=n, random_state=self.random_state), float)
+        emission_times = np.cumsum(delays)
+
+        # --- positions on the circular emission surface (area-uniform via sqrt(CDF)) ---
+        raw_r = self.pos_distribution.rvs(size=n, random_state=self.random_state)
+        u = np.clip(self.pos_distribution.cdf(raw_r), 0.0, 1.0)
+        r = self.radius * np.sqrt(u)
+        theta = 2 * np.pi * self.rng.random(n)
+        positions = np.stack([np.zeros(n), r * np.cos(theta), r * np.sin(theta)], axis=-1)
+
+        # --- velocity norms ---
+        if self.vel_norm_distribution is None:
+            speeds = np.full(n, self.constant_speed)
+        else:
+            speeds = np.asarray(self.vel_norm_distribution.rvs(size=n, random_state=self.random_state), float)
+
+        # --- velocity directions ---
+        if callable(self.vel_dir_distribution_params):
+            directions = np.asarray(self.vel_dir_distribution_params(size=n), float).reshape(n, 3)
+        else:
+            directions = np.broadcast_to(np.asarray(self.vel_dir_distribution_params, float), (n, 3))
+        return emission_times, positions, self._velocities(speeds, directions)
+
+    def _velocities(self, speeds: np.ndarray, directions: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(directions, axis=1)
+        if np.any(norms == 0):
+            raise ValueError("Velocity direction sampler returned a null vector.")
+        return speeds[:, np.newaxis] * directions / norms[:, np.newaxis]
+
+    # quasi-Monte Carlo - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    QMC_DIMENSIONS = 6  # emission delay, position radius, position angle, direction (2), speed
+
+    def qmc_uniforms(self, n: int) -> np.ndarray:
+        """
+        Next n points (n, QMC_DIMENSIONS) of the scrambled low-discrepancy sequence. The scrambling is drawn
+        from the random stream when the engine is first used, so every seed (replicate) gets an independent
+        randomization of the same sequence : estimates stay unbiased and their spread over replicates
+        measures the error (randomized QMC).
+        Sobol points are drawn in aligned blocks of 2^m points (balance property) : the engine is moved to the
+        next multiple of 2^m >= n, and for n not a power of 2 the first n points of the block are returned
+        (the rest of the block is skipped).
+        """
+        if self._qmc_engine is None:
+            engine = qmc.Sobol if self.qmc == 'sobol' else qmc.Halton
+            seed = self.random_state if self.random_state is not None else np.random.default_rng(np.random.randint(2**32))
+            self._qmc_engine = engine(d=self.QMC_DIMENSIONS, scramble=True, seed=seed)
+        n = int(n)
+        if self.qmc == 'sobol' and n > 0:
+            block = 1 << (n - 1).bit_length()
+            skip = -self._qmc_engine.num_generated % block
+            if skip > 0:
+                self._qmc_engine.fast_forward(skip)
+            points = self._qmc_engine.random(block)[:n]
+        else:
+            points = self._qmc_engine.random(n)
+        # keep the inverse CDFs finite (scrambled points can be exactly 0)
+        return np.clip(points, np.finfo(float).tiny, 1.0 - np.finfo(float).eps)
+
+    def _sample_block_uniforms(self, U: np.ndarray):
+        """`sample_block` from given uniforms U of shape (n, QMC_DIMENSIONS), through the inverse CDFs."""
+        n = len(U)
+        # --- emission delays ---
+        if self.emit_distribution is None:
+            delays = np.full(n, self.constant_emit_delay)
+        else:
+            delays = np.asarray(self.emit_ppf(U[:, 0]), float)
+        emission_times = np.cumsum(delays)
+
+        # --- positions on the circular emission surface (same sqrt(CDF) rule) ---
+        r = self.radius * np.sqrt(self._position_u(U[:, 1]))
+        theta = 2 * np.pi * U[:, 2]
+        positions = np.stack([np.zeros(n), r * np.cos(theta), r * np.sin(theta)], axis=-1)
+
+        # --- velocity norms ---
+        if self.vel_norm_distribution is None:
+            speeds = np.full(n, self.constant_speed)
+        else:
+            speeds = np.asarray(self.vel_norm_ppf(U[:, 5]), float)
+
+        # --- velocity directions ---
+        if callable(self.vel_dir_distribution_params):
+            directions = np.asarray(self.vel_dir_distribution_params(size=n, uniforms=U[:, 3:5]), float).reshape(n, 3)
+        else:
+            directions = np.broadcast_to(np.asarray(self.vel_dir_distribution_params, float), (n, 3))
+        return emission_times, positions, self._velocities(speeds, directions)
+
+    def mean_emit_delay(self) -> float:
+        """Expected delay between two emissions."""
+        if self.emit_distribution is None:
+            return self.constant_emit_delay
+        return float(self.emit_distribution.mean())
+
+    def emission_schedule(self, t_end: float, block_size: int = None):
+        """
+        Every emission in [0, t_end), drawn block by block with `sample_block`.
+        With qmc='sobol' the block size is rounded up to a power of 2 : every block is then a balanced
+        (aligned 2^m points) piece of the Sobol sequence.
+        Returns (emission_times, positions, velocities), sorted by emission time.
+        """
+        mean_delay = self.mean_emit_delay()
+        if not mean_delay > 0:
+            raise ValueError("Emission schedule requires a strictly positive mean emission delay.")
+        if block_size is None:
+            block_size = int(np.ceil(1.1 * t_end / mean_delay)) + 16  # usually a single block
+        if self.qmc == 'sobol':
+            block_size = 1 << (int(block_size) - 1).bit_length()
+
+        times, positions, velocities = [np.empty(0)], [np.empty((0, 3))], [np.empty((0, 3))]  # empty for t_end <= 0
+        t_start = 0.0
+        while t_start < t_end:
+            block_times, block_pos, block_vel = self.sample_block(block_size)
+            block_times = block_times + t_start
+            t_start = block_times[-1]
+            keep = block_times < t_end
+            times.append(block_times[keep])
+            positions.append(block_pos[keep])
+            velocities.append(block_vel[keep])
+
+        return np.concatenate(times), np.concatenate(positions, axis=0), np.concatenate(velocities, axis=0)
@@ -0,0 +1,123 @@
+####################################################################################################
+
+# Imports
+from . import *
+
+import time
+from typing import Callable, Optional
+
+####################################################################################################
+
+class RunStats:
+    """
+    Wall-clock timers and counters of one simulation run, filled by the engines of `run`.
+
+    timers : cumulative seconds spent in each phase
+        generation : drawing the emission schedule
+        emission   : releasing the scheduled emissions into the living particles
+        update     : moving the living particles
+        detection  : sensor sampling
+        culling    : sorting out and removing the particles that passed the sensor
+        idle       : skipped steps (plain motion, see skip_idle)
+    """
+
+    PHASES = ('generation', 'emission', 'update', 'detection', 'culling', 'idle')
+
+    def __init__(self, total_steps: int = 0):
+        self.timers = dict.fromkeys(self.PHASES, 0.0)
+        self.total_steps = int(total_steps)
+        self.step = 0  # steps done, processed or skipped
+        self.processed_steps = 0
+        self.skipped_steps = 0
+        self.t = 0.0  # simulation time
+        self.living = 0
+        self.max_living = 0
+        self.emissions = 0
+        self.detections = 0
+        self.lost = 0
+        self.wall_time = None  # set by finish()
+        self._start = time.perf_counter()
+
+    def lap(self, phase: str, tic: float) -> float:
+        """Add the time elapsed since `tic` (a time.perf_counter value) to `phase`; returns the new tic."""
+        toc = time.perf_counter()
+        self.timers[phase] += toc - tic
+        return toc
+
+    def set_living(self, living: int):
+        self.living = int(living)
+        self.max_living = max(self.max_living, self.living)
+
+    def finish(self):
+        self.wall_time = time.perf_counter() - self._start
+
+    @property
+    def elapsed(self) -> float:
+        """Wall-clock seconds since the start of the run (total duration once finished)."""
+        return self.wall_time if self.wall_time is not None else time.perf_counter() - self._start
+
+    @property
+    def steps_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.step / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def progress(self) -> float:
+        """Fraction of the steps done (1 for a run without steps)."""
+        return min(self.step / self.total_steps, 1.0) if self.total_steps > 0 else 1.0
+
+    def as_dict(self) -> dict:
+        return {'wall_time': self.elapsed, 'steps_per_second': self.steps_per_second, 'total_steps': self.total_steps,
+                'steps': self.step, 'processed_steps': self.processed_steps, 'skipped_steps': self.skipped_steps,
+                'emissions': self.emissions, 'detections': self.detections, 'lost': self.lost,
+                'max_living': self.max_living, **{f'time_{phase}': value for phase, value in self.timers.items()}}
+
+    def __repr__(self):
+        elapsed = self.elapsed
+        phases = ", ".join(f"{phase} {value:.3f} s ({100 * value / elapsed if elapsed > 0 else 0:.0f}%)"
+                           for phase, value in self.timers.items() if value > 0)
+        return (f"RunStats({self.step}/{self.total_steps} steps ({self.skipped_steps} skipped) in {elapsed:.3f} s, "
+                f"{self.steps_per_second:.0f} steps/s, emissions: {self.emissions}, detections: {self.detections}, "
+                f"lost: {self.lost}, max living: {self.max_living} | {phases})")
+
+
+####################################################################################################
+
+class ProgressHook:
+    """
+    Throttled progress callback : `callback(stats)` is called at most once every `interval` seconds of
+    wall clock, or every `every` steps when given, plus once at the end of the run (close).
+    """
+
+    def __init__(self, callback: Callable[[RunStats], None], interval: float = 0.1, every: Optional[int] = None):
+        if every is not None and every < 1:
+            raise ValueError("every must be a positive number of steps.")
+        self.callback = callback
+        self.interval = float(interval)
+        self.every = every
+        self._next_time = time.perf_counter()
+        self._next_step = 0
+
+    def __call__(self, stats: RunStats):
+        if self.every is not None:
+            if stats.step < self._next_step:
+                return
+            self._next_step = stats.step + self.every
+        else:
+            now = time.perf_counter()
+            if now < self._next_time:
+                return
+            self._next_time = now + self.interval
+        self.callback(stats)
+
+    def close(self, stats: RunStats):
+        self.callback(stats)
+
+
+def print_progress(stats: RunStats):
+    """Default progress callback of `run` : a one-line progress bar, rewritten in place."""
+    bar_length = 30
+    filled = int(stats.progress * bar_length)
+    bar = "█" * filled + "-" * (bar_length - filled)
+    print(f"\rProgress: |{bar}| {stats.progress*100:5.1f}%. Current living particles: {stats.living} "
+          f"Timing : {stats.t:.2f} s ({stats.steps_per_second:.0f} steps/s)", end="")
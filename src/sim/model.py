@@ -3,10 +3,16 @@
 # Imports
 from . import *
 
-from typing import List, Tuple
+import time
+from typing import Callable, List, Tuple, Union
 from .generator import GeneratorCircle
-from .sensor import RectangularSensor
-from .particle import Particle
+from .instrument import RunStats, ProgressHook, print_progress
+from .sensor import RectangularSensor, SensorGrid, sample_ticks
+from .particle import Particle, ParticleArray, DETECTION_RECORD_DTYPE, particles_to_record, record_to_particles
+
+# Version of the simulation code : bump it whenever a change alters the results of `run` for given
+# parameters and seed (cached results of older versions are then invalidated, see src/cache.py).
+ENGINE_VERSION = "6"
 
 ####################################################################################################
 
@@ -16,12 +22,64 @@ def run(
     visualize = False,  # visualize simulation
     visual_slowdown: float = 0.02,  # seconds pause per frame for visualization
     is_progressive: bool = True,  # show progress bar
+    mode: str = "loop",  # simulation engine : "loop", "vectorized" (struct-of-arrays) or "analytic" (event-driven)
+    as_record: bool = False,  # return a columnar detection record and a lost count instead of Particle objects
+    sensors: list = None,  # several sensors (RectangularSensor or dicts of its parameters) instead of the sen_ params
+    skip_idle: bool = True,  # jump over the steps where nothing but motion can happen (same results)
+    generator: GeneratorCircle = None,  # prebuilt generator used instead of the gen_ params (gen_seed still applies)
+    progress: Callable[[RunStats], None] = None,  # progress callback, replaces the progress bar of is_progressive
+    progress_interval: float = 0.1,  # seconds of wall clock between two progress calls
+    progress_every: int = None,  # call progress every n steps instead (overrides progress_interval)
+    return_stats: bool = False,  # also return the RunStats of the run
+    exact: bool = False,  # mode="analytic" only : continuous entry times and durations instead of sensor samples
     **params
-    ) -> Tuple[List[Particle], int]:
+    ) -> Union[Tuple[List[Particle], List[int]], Tuple[np.ndarray, int]]:
     """
     Create and run the particle simulation model.
+
+    mode :
+        "loop"       : reference engine, updates each Particle object in Python.
+        "vectorized" : keeps the living particles in a ParticleArray and does motion, detection
+                       and culling as one NumPy operation per step. Same detected/lost results.
+        "analytic"   : no time stepping. Emissions are drawn up to run_duration and the exact sensor
+                       entry / exit times of every straight trajectory are computed in one vectorized
+                       pass. Same sensor sampling and culling as the stepping engines, without their 1/clock
+                       time steps (the record position is taken at the exact culling time).
+                       With exact=True, detection_time is the real entry time and detection_duration the real
+                       residence time (exit - entry, clipped to run_duration) : no 1/fs quantisation.
+
+    Detection is resolved on the sensor timeline (samples k/fs, linear interpolation of the trajectories
+    between simulation steps), so the simulation clock can be much lower than sen_fs. A particle is detected
+    at its first sample inside the sensor; each further sample adds 1/fs to its detection duration.
+
+    Returns (detected_particles, lost_particle_ids), or with as_record=True (record, lost_count) where
+    record is a structured array of dtype DETECTION_RECORD_DTYPE (one row per detected particle).
+    Particle ids are the emission indices of the run (0, 1, 2, ...), so a given seed always gives the same ids.
+
+    skip_idle : in the "loop" and "vectorized" engines, steps before the next emission, sensor entry or culling
+    only move the particles; they are done as plain position updates, without emission, detection,
+    culling or progress calls. Results are identical to skip_idle=False.
+
+    sensors : list of sensors (mode="vectorized" only). Detection goes through a SensorGrid, so each particle
+    is only tested against the sensors of its grid cell. The first returned item is then a list with one
+    entry (particles or record) per sensor; lost particles are those detected by no sensor. Culling is per
+    sensor, so the entry of each sensor is the one a single-sensor run with the same seed would give.
+
+    progress : called with the RunStats of the run every progress_interval seconds (or every progress_every
+    steps) and once at the end. With is_progressive and no callback, it prints the progress bar.
+    return_stats : append the RunStats (phase timers, steps/s, emissions, detections, max living particles)
+    to the returned tuple.
     ####################################################################################################
     """
+    if mode not in ("loop", "vectorized", "analytic"):
+        raise ValueError(f"Unknown simulation mode : {mode}")
+    if visualize and mode != "loop":
+        raise ValueError("visualize=True is only available with mode='loop'.")
+    if exact and mode != "analytic":
+        raise ValueError("exact=True is only available with mode='analytic'.")
+    if sensors is not None and mode != "vectorized":
+        raise ValueError("sensors=[...] is only available with mode='vectorized'.")
+
     # ------------------------------------------------------------------------------------------------------------
     # separation of parameters
     # ------------------------------------------------------------------------------------------------------------
@@ -37,8 +95,18 @@ def run(
             print(f"[WARNING] Unknown param '{key}' ignored")
 
     # Create generator and sensor -----------------------------------------------------------------------------------
-    generator = GeneratorCircle(**generator_params)
-    sensor = RectangularSensor(**sensor_params)
+    if generator is None:
+        generator = GeneratorCircle(**generator_params)
+    else:
+        generator.reseed(generator_params.pop('seed', None))
+        if generator_params:
+            print("[WARNING] gen_ params ignored because a generator is given")
+    if sensors is None:
+        sensor = RectangularSensor(**sensor_params)
+    else:
+        if sensor_params:
+            print("[WARNING] sen_ params ignored because a sensors list is given")
+        grid = SensorGrid([s if isinstance(s, RectangularSensor) else RectangularSensor(**s) for s in sensors])
 
     # Initialization -----------------------------------------------------------------------------------
 
@@ -46,37 +114,73 @@ def run(
     t = 0.0
     dt = 1.0 / clock  # simulation time step
     total_steps = int(run_duration * clock)
+    step_times = _step_times(dt, total_steps)  # t at each step, as accumulated by t += dt
+
+    # instrumentation
+    stats = RunStats(0 if mode == "analytic" else total_steps)
+    if progress is None and is_progressive and mode != "analytic":
+        progress = print_progress
+    hook = None if progress is None else ProgressHook(progress, progress_interval, progress_every)
+
+    # emission buffer : every emission of the run drawn in blocks, consumed step by step
+    tic = time.perf_counter()
+    schedule = generator.emission_schedule(run_duration)
+    stats.lap('generation', tic)
+    next_emission = 0  # index of the first emission not yet released
 
     # init particle
     living_particles : List[Particle] = []
     lost_particles : List[int] = [] # store id of lost particles
     detected_particles :List[Particle] = []
+    record = None  # columnar detection record (built directly by the array engines)
 
     # Main simulation loop -----------------------------------------------------------------------------------
-    if is_progressive:
+    if is_progressive and mode != "analytic":
         print(f"Starting simulation with {total_steps} steps...")
 
-    if not visualize:
-        for step in range(total_steps):
-            if is_progressive:
-                percent = (step + 1) / total_steps
-                bar_length = 30
-                filled = int(percent * bar_length)
-
-                bar = "█" * filled + "-" * (bar_length - filled)
-                print(f"\rProgress: |{bar}| {percent*100:5.1f}%. Current living particles: {len(living_particles)} Timing : {t} s", end="")
-            # --- Update generator ---
-            new_particle = generator(dt) #emit new particle or None
-            if new_particle:
-                new_particle.emission_time = t
-                # generator returns a single Particle or None
+    if sensors is not None:
+        records, lost_particles, _ = _run_vectorized_multi(schedule, grid, dt, total_steps, skip_idle, stats=stats, progress=hook)
+        stats.detections, stats.lost = sum(len(r) for r in records), len(lost_particles)
+        stats.finish()
+        if hook is not None:
+            hook.close(stats)
+        if is_progressive:
+            print("")  # new line after progress bar
+            print(f"\nSimulation finished.Max particules encountered: {len(schedule[0])},\n Lost particles: {len(lost_particles)},\n Detected particles per sensor: {[len(r) for r in records]}")
+        results = (records, len(lost_particles)) if as_record else ([record_to_particles(r) for r in records], lost_particles)
+        return results + (stats,) if return_stats else results
+
+    if mode == "vectorized":
+        record, lost_particles = _run_vectorized(schedule, sensor, dt, total_steps, skip_idle, stats=stats, progress=hook)
+
+    elif mode == "analytic":
+        record, lost_particles = _run_analytic(schedule, sensor, run_duration, stats=stats, exact=exact)
+
+    elif not visualize:
+        events = np.empty((0, 3))  # (enter, exit, cull) times of the living particles, for idle skipping
+        recheck = 0  # next step where idle skipping is worth evaluating
+        step = 0
+        while step < total_steps:
+            t = step_times[step]
+            # --- Release scheduled emissions ---
+            tic = time.perf_counter()
+            emission_times, positions, velocities, next_emission = _scheduled_emissions(schedule, next_emission, t, dt)
+            for index, emission_time, position, velocity in zip(range(next_emission - len(emission_times), next_emission), emission_times, positions, velocities):
+                new_particle = Particle(position=position, velocity=velocity, id=index)
+                new_particle.emission_time = float(emission_time)
                 living_particles.append(new_particle)
+            if skip_idle and len(emission_times) > 0:
+                events = np.concatenate([events, _event_times(sensor, positions, velocities, t, emission_times)])
+            stats.emissions += len(emission_times)
+            tic = stats.lap('emission', tic)
 
             # --- Update particles ---
             for particle in living_particles:
                 particle.update(dt)
-                # --- Check detection ---
-                sensor.update(particle, t)
+            tic = stats.lap('update', tic)
+            # --- Check detection (sensor samples in (t, t + dt]) ---
+            sensor.update(living_particles, t, dt)
+            for particle in living_particles:
                 try:
                     if np.any(particle.position >= sensor.get_range_detect_bounds()) and particle.detection_is_detected:
                         detected_particles.append(particle)
@@ -85,17 +189,41 @@ def run(
                 except Exception:
                     # in case of malformed comparisons, ignore
                     pass
+            tic = stats.lap('detection', tic)
 
             # --- Remove particles ---
             try:
-                living_particles = [p for p in living_particles if np.all(p.position < sensor.get_range_detect_bounds())]
+                keep = [bool(np.all(p.position < sensor.get_range_detect_bounds())) for p in living_particles]
             except Exception:
                 # fallback: remove particles far beyond sensor in x
                 max_x = float(sensor.position[0,0]) + 10.0 * float(sensor.dimensions[0])
-                living_particles = [p for p in living_particles if p.position[0,0] < max_x]
+                keep = [bool(p.position[0,0] < max_x) for p in living_particles]
+            living_particles = [p for p, k in zip(living_particles, keep) if k]
+            if skip_idle:
+                events = events[np.array(keep, bool)] if len(keep) else events
+            tic = stats.lap('culling', tic)
 
             # Advance simulation time
-            t += dt
+            step += 1
+            stats.processed_steps += 1
+            stats.set_living(len(living_particles))
+            stats.detections = len(detected_particles)
+            if skip_idle and step >= recheck:
+                busy, recheck = _next_busy_step(events, schedule, next_emission, step_times, step, dt)
+                if busy > step and living_particles:
+                    # idle steps : plain motion of every living particle
+                    P = np.concatenate([p.position for p in living_particles])
+                    V = np.concatenate([p.velocity for p in living_particles])
+                    for _ in range(busy - step):
+                        P += V * dt
+                    for particle, position in zip(living_particles, P):
+                        particle.position[0] = position
+                stats.skipped_steps += busy - step
+                step = busy
+                stats.lap('idle', tic)
+            stats.step, stats.t = step, step_times[step]
+            if hook is not None:
+                hook(stats)
 
     else:
         # Visual mode: interactive matplotlib 2D view (x,z). y is out-of-plane -------------------------------------------------
@@ -137,17 +265,12 @@ def run(
         plt.legend()
         # Main loop -----------------------------------------------------------------------------------
         for step in range(total_steps):
-            if is_progressive:
-                ## progress bar :
-                percent = (step + 1) / total_steps
-                bar_length = 30
-                filled = int(percent * bar_length)
-                bar = "█" * filled + "-" * (bar_length - filled)
-                print(f"\rProgress: |{bar}| {percent*100:5.1f}%. Current living particles: {len(living_particles)}. Timing : {t:.2f} s", end="")
-            # --- Update generator ---
-            new_particle = generator(dt)
-            if new_particle:
-                new_particle.emission_time = t
+            # --- Release scheduled emissions ---
+            emission_times, positions, velocities, next_emission = _scheduled_emissions(schedule, next_emission, t, dt)
+            stats.emissions += len(emission_times)
+            for index, emission_time, position, velocity in zip(range(next_emission - len(emission_times), next_emission), emission_times, positions, velocities):
+                new_particle = Particle(position=position, velocity=velocity, id=index)
+                new_particle.emission_time = float(emission_time)
                 living_particles.append(new_particle)
             # visualization data
             xs = []
@@ -196,6 +319,12 @@ def run(
             plt.pause(max(visual_slowdown, 0.001))
 
             t += dt
+            stats.step = stats.processed_steps = step + 1
+            stats.t = t
+            stats.set_living(len(living_particles))
+            stats.detections = len(detected_particles)
+            if hook is not None:
+                hook(stats)
 
         plt.ioff()
         plt.show()
@@ -207,11 +336,452 @@ def run(
         else:
             if particle.id not in lost_particles:
                 lost_particles.append(particle.id)
+    if record is None and as_record:
+        record = particles_to_record(detected_particles)
+    elif record is not None and not as_record:
+        detected_particles = record_to_particles(record)
+    stats.detections = len(detected_particles) if record is None else len(record)
+    stats.lost = len(lost_particles)
+    stats.finish()
+    if hook is not None:
+        hook.close(stats)
     if is_progressive:
         print("")  # new line after progress bar
-        print(f"\nSimulation finished.Max particules encountered: {Particle.id_counter},\n Lost particles: {len(lost_particles)},\n Detected particles: {len(detected_particles)}")
+        print(f"\nSimulation finished.Max particules encountered: {len(schedule[0])},\n Lost particles: {len(lost_particles)},\n Detected particles: {len(detected_particles) if record is None else len(record)}")
         #print(f"detected IDs: {[p.id for p in detected_particles]}")
         #print(f"lost IDs: {lost_particles}")
-    return detected_particles, lost_particles
+    results = (record, len(lost_particles)) if as_record else (detected_particles, lost_particles)
+    return results + (stats,) if return_stats else results
+
+
+####################################################################################################
+
+def run_common(
+    clock = 60,  # simu rate (Hz)
+    run_duration = 10.0,  # simu duration (s)
+    sensors: list = None,  # K sensor configurations (RectangularSensor or dicts of its parameters)
+    mode: str = "analytic",  # detection engine : "analytic" or "vectorized"
+    skip_idle: bool = True,  # mode="vectorized" : jump over the steps where nothing but motion can happen
+    generator: GeneratorCircle = None,  # prebuilt generator used instead of the gen_ params (gen_seed still applies)
+    **params
+    ) -> List[Tuple[np.ndarray, int]]:
+    """
+    Common random numbers : one emission stream evaluated against K independent sensor configurations.
+
+    The emission schedule is drawn once from the gen_ params, then each configuration runs the detection
+    engine on it as if it were alone (its own culling and lost particles), so differences between the
+    configurations only come from their geometry. The same emission keeps the same particle id in every
+    configuration, so records can be paired by id.
+    mode="analytic" evaluates the configurations one after the other (each costs O(emissions)).
+    mode="vectorized" advances the particles once for all of them, through a SensorGrid with per-sensor culling
+    (see `_run_vectorized_multi`), so motion and emission are shared and detection only meets nearby sensors.
+    Returns one (record, lost_count) per configuration, as run(..., as_record=True) would.
+    """
+    if mode not in ("vectorized", "analytic"):
+        raise ValueError(f"run_common supports mode 'vectorized' or 'analytic', got {mode}")
+    if not sensors:
+        raise ValueError("run_common needs at least one sensor configuration.")
+    generator_params = {}
+    for key, val in params.items():
+        if key.startswith("gen_"):
+            generator_params[key[4:]] = val
+        elif key.startswith("sen_"):
+            print(f"[WARNING] Sensor param '{key}' ignored because sensors are given")
+        else:
+            print(f"[WARNING] Unknown param '{key}' ignored")
+    if generator is None:
+        generator = GeneratorCircle(**generator_params)
+    else:
+        generator.reseed(generator_params.pop('seed', None))
+
+    schedule = generator.emission_schedule(run_duration)
+    dt = 1.0 / clock
+    total_steps = int(run_duration * clock)
+    sensors = [s if isinstance(s, RectangularSensor) else RectangularSensor(**s) for s in sensors]
+    if mode == "vectorized":
+        records, _, lost_counts = _run_vectorized_multi(schedule, SensorGrid(sensors), dt, total_steps, skip_idle)
+        return list(zip(records, lost_counts))
+    results = []
+    for sensor in sensors:
+        record, lost = _run_analytic(schedule, sensor, run_duration)
+        results.append((record, len(lost)))
+    return results
+
+
+####################################################################################################
+
+def _scheduled_emissions(schedule: Tuple[np.ndarray, np.ndarray, np.ndarray],
+                         start: int,
+                         t: float,
+                         dt: float
+                         ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """
+    Emissions of the buffer (from index `start`) that happen during the step [t, t+dt).
+    Positions are moved back to time t, so that the step update brings each particle to its exact
+    position at t+dt. Returns (emission_times, positions, velocities, next_start).
+    """
+    emission_times, positions, velocities = schedule
+    stop = int(np.searchsorted(emission_times, t + dt, side='left'))
+    velocities = velocities[start:stop]
+    positions = positions[start:stop] - velocities * (emission_times[start:stop] - t)[:, np.newaxis]
+    return emission_times[start:stop], positions, velocities, stop
 
 
+####################################################################################################
+
+def _run_vectorized(schedule: Tuple[np.ndarray, np.ndarray, np.ndarray],
+                    sensor: RectangularSensor,
+                    dt: float,
+                    total_steps: int,
+                    skip_idle: bool = True,
+                    ids: np.ndarray = None,
+                    stats: RunStats = None,
+                    progress: ProgressHook = None
+                    ) -> Tuple[np.ndarray, List[int]]:
+    """
+    Struct-of-arrays version of the main loop of `run`.
+    Steps are identical to the loop engine (emit, move, detect, sort out exits, cull) but each one
+    works on all living particles at once. Returns (detection_record, lost_particle_ids).
+    ids : particle ids of the schedule entries (their emission indices when None).
+    stats, progress : RunStats filled during the run and ProgressHook called after each processed step.
+    """
+    stats = RunStats(total_steps) if stats is None else stats
+    step_times = _step_times(dt, total_steps)
+    next_emission = 0
+    living = ParticleArray()
+    events = np.empty((0, 3))  # (enter, exit, cull) times of the living particles, for idle skipping
+    recheck = 0  # next step where idle skipping is worth evaluating
+    lost_particles : List[int] = []
+    detected_chunks : List[np.ndarray] = []
+
+    step = 0
+    while step < total_steps:
+        t = step_times[step]
+        # --- Release scheduled emissions ---
+        tic = time.perf_counter()
+        released = next_emission
+        emission_times, positions, velocities, next_emission = _scheduled_emissions(schedule, next_emission, t, dt)
+        new_ids = np.arange(released, next_emission) if ids is None else ids[released:next_emission]
+        living.extend(new_ids, positions, velocities, emission_times)
+        if skip_idle and len(emission_times) > 0:
+            events = np.concatenate([events, _event_times(sensor, positions, velocities, t, emission_times)])
+        stats.emissions += len(emission_times)
+        tic = stats.lap('emission', tic)
+
+        if len(living) > 0:
+            # --- Update particles ---
+            living.update(dt)
+            tic = stats.lap('update', tic)
+            # --- Check detection (sensor samples in (t, t + dt]) ---
+            sensor.update_array(living, t, dt)
+            tic = stats.lap('detection', tic)
+            # --- Sort out and remove particles that passed the sensor ---
+            exiting = sensor.is_beyond(living.position)
+            if np.any(exiting):
+                detected_chunks.append(living.to_record(exiting & living.is_detected))
+                stats.detections += len(detected_chunks[-1])
+                lost_particles.extend(living.id[exiting & ~living.is_detected].tolist())
+                living.keep(~exiting)
+                if skip_idle:
+                    events = events[~exiting]
+            tic = stats.lap('culling', tic)
+
+        # Advance simulation time
+        step += 1
+        stats.processed_steps += 1
+        stats.set_living(len(living))
+        if skip_idle and step >= recheck:
+            busy, recheck = _next_busy_step(events, schedule, next_emission, step_times, step, dt)
+            for _ in range(busy - step):  # idle steps : plain motion
+                living.update(dt)
+            stats.skipped_steps += busy - step
+            step = busy
+            stats.lap('idle', tic)
+        stats.step, stats.t = step, step_times[step]
+        if progress is not None:
+            progress(stats)
+
+    # Final detection
+    detected_chunks.append(living.to_record(living.is_detected))
+    lost_particles.extend(living.id[~living.is_detected].tolist())
+    return np.concatenate(detected_chunks), lost_particles
+
+
+def _step_times(dt: float, total_steps: int) -> np.ndarray:
+    """Simulation time at the start of each step (and at the end of the run), accumulated exactly as t += dt."""
+    return np.cumsum(np.concatenate([[0.0], np.full(total_steps, dt)]))
+
+
+def _event_times(sensor: RectangularSensor, positions: np.ndarray, velocities: np.ndarray, t: float,
+                 emission_times: np.ndarray) -> np.ndarray:
+    """
+    Absolute (sensor entry, sensor exit, culling) times of straight trajectories located at `positions` at time t.
+    Entry is inf for trajectories missing the sensor.
+    """
+    t_enter, t_exit = sensor.crossing_times(positions, velocities)
+    enter = np.maximum(t + t_enter, emission_times)
+    exit_ = t + t_exit
+    enter = np.where(enter > exit_, np.inf, enter)
+    cull = t + sensor.beyond_times(positions, velocities)
+    return np.stack([enter, exit_, cull], axis=1)
+
+
+def _grid_event_times(grid: SensorGrid, positions: np.ndarray, velocities: np.ndarray, t: float,
+                      emission_times: np.ndarray, t_end: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    `_event_times` against a grid, only for the sensors that the trajectories enter before t_end (found among
+    the candidates of the cells they cross) : returns (rows, sensors, (M, 3) events) for these pairs, and the
+    absolute times after which each trajectory has passed every sensor (`SensorGrid.is_beyond`), (N,).
+    """
+    rows, sensors = grid.trajectory_candidates(positions, velocities, t_end - t)
+    t_enter, t_exit = grid.crossing_times(positions[rows], velocities[rows], sensors)
+    enter = np.maximum(t + t_enter, emission_times[rows])
+    exit_ = t + t_exit
+    entered = (enter <= exit_) & (enter <= t_end)
+    rows, sensors = rows[entered], sensors[entered]
+    cull = t + grid.beyond_times(positions[rows], velocities[rows], sensors)
+    events = np.stack([enter[entered], exit_[entered], cull], axis=1)
+    return rows, sensors, events, t + grid.beyond_all_times(positions, velocities)
+
+
+def _next_busy_step(events: np.ndarray, schedule: Tuple[np.ndarray, np.ndarray, np.ndarray], next_emission: int,
+                    step_times: np.ndarray, step: int, dt: float) -> Tuple[int, int]:
+    """
+    First step from `step` on that can do more than moving the particles : release an emission, take a sensor
+    sample or cull a particle (given the event times of the living particles). A two-step margin absorbs
+    rounding, so the skipped steps are exactly those the engines would have done without effect.
+    Also returns the first step worth asking again : while particles are inside the sensor, nothing can be
+    skipped before the earliest of their exits.
+    """
+    emission_times = schedule[0]
+    next_event = emission_times[next_emission] if next_emission < len(emission_times) else np.inf
+    recheck = step
+    if len(events) > 0:
+        now = step_times[min(step, len(step_times) - 1)]
+        enter, exit_, cull = events.T
+        inside = (enter <= now) & (exit_ >= now)
+        if np.any(inside):
+            recheck = max(int(np.searchsorted(step_times, np.min(exit_[inside]), side='left')), step)
+            return step, recheck
+        pending = np.where(enter > now, np.minimum(enter, cull), cull)
+        next_event = min(next_event, pending.min())
+    busy = int(np.searchsorted(step_times, next_event - 2 * dt, side='left')) - 1
+    return min(max(busy, step), len(step_times) - 1), recheck
+
+
+####################################################################################################
+
+def _run_vectorized_multi(schedule: Tuple[np.ndarray, np.ndarray, np.ndarray],
+                          grid: SensorGrid,
+                          dt: float,
+                          total_steps: int,
+                          skip_idle: bool = True,
+                          ids: np.ndarray = None,
+                          stats: RunStats = None,
+                          progress: ProgressHook = None
+                          ) -> Tuple[List[np.ndarray], List[int], List[int]]:
+    """
+    `_run_vectorized` for several sensors. Detection state is kept per (particle, sensor) pair that has
+    been inside a sensor at least once, in arrays sorted by key = particle_id * K + sensor, so memory and
+    work follow the particles x nearby sensors actually met, not particles x all sensors.
+    Culling is applied per sensor, as if each one were alone : a pair stops sampling and goes to the records
+    once its particle has passed the max corner of that sensor, and the particle leaves the living array
+    once it has passed every sensor. Each sensor then gets the record of a single-sensor run on the same
+    emissions. Passing a max corner at some step end is sticky, and positions are monotonic along each axis,
+    so it is tested on the per-axis maximum of the positions over the step ends (`peak`).
+    skip_idle : as in `_run_vectorized`, with event times per (particle, sensor) pair that the trajectory enters
+    (found through the grid cells it crosses, so the cost follows the nearby sensors too) and the time each
+    particle passes every sensor; the pairs already passed are dropped.
+    ids : particle ids of the schedule entries (their emission indices when None).
+    Returns (one detection record per sensor, ids detected by no sensor, lost count per sensor).
+    """
+    stats = RunStats(total_steps) if stats is None else stats
+    K = len(grid)
+    step_times = _step_times(dt, total_steps)
+    next_emission = 0
+    living = ParticleArray()
+    peak = np.empty((0, 3))  # per-axis max of the living positions over the step ends
+    seen = np.empty(0, bool)  # living particles detected by at least one sensor
+    # idle skipping : (enter, exit, cull) times of the (particle, sensor) pairs entered, time each particle passes every sensor
+    event_id, event_sensor, events = np.empty(0, np.int64), np.empty(0, np.int64), np.empty((0, 3))
+    beyond = np.empty(0)
+    t_end = step_times[-1]
+    recheck = 0  # next step where idle skipping is worth evaluating
+    lost_particles : List[int] = []
+    detected_chunks : List[Tuple[np.ndarray, np.ndarray]] = []  # (sensor index, record) per release
+    # (particle, sensor) detection state
+    pair_key = np.empty(0, np.int64)
+    pair_time = np.empty(0, float)
+    pair_duration = np.empty(0, float)
+    pair_position = np.empty((0, 3), float)
+
+    def release(done: np.ndarray):
+        """Move the pairs of the `done` mask to the detection records, positions taken at the current step."""
+        nonlocal pair_key, pair_time, pair_duration, pair_position
+        pair_id = pair_key[done] // K
+        r = np.searchsorted(living.id, pair_id)  # living ids are sorted (emission order)
+        record = np.empty(len(r), dtype=DETECTION_RECORD_DTYPE)
+        record['id'] = pair_id
+        record['emission_time'] = living.emission_time[r]
+        record['detection_time'] = pair_time[done]
+        record['detection_duration'] = pair_duration[done]
+        record['position'] = living.position[r]
+        record['velocity'] = living.velocity[r]
+        record['detection_position'] = pair_position[done]
+        detected_chunks.append((pair_key[done] % K, record))
+        stats.detections += len(record)
+        keep = ~done
+        pair_key, pair_time, pair_duration, pair_position = pair_key[keep], pair_time[keep], pair_duration[keep], pair_position[keep]
+
+    step = 0
+    while step < total_steps:
+        t = step_times[step]
+        # --- Release scheduled emissions ---
+        tic = time.perf_counter()
+        released = next_emission
+        emission_times, positions, velocities, next_emission = _scheduled_emissions(schedule, next_emission, t, dt)
+        new_ids = np.arange(released, next_emission) if ids is None else ids[released:next_emission]
+        living.extend(new_ids, positions, velocities, emission_times)
+        if len(emission_times) > 0:
+            peak = np.concatenate([peak, np.full((len(emission_times), 3), -np.inf)])
+            seen = np.concatenate([seen, np.zeros(len(emission_times), bool)])
+            if skip_idle:
+                rows, sens, new_events, new_beyond = _grid_event_times(grid, positions, velocities, t, emission_times, t_end)
+                event_id = np.concatenate([event_id, new_ids[rows]])
+                event_sensor = np.concatenate([event_sensor, sens])
+                events = np.concatenate([events, new_events])
+                beyond = np.concatenate([beyond, new_beyond])
+        stats.emissions += len(emission_times)
+        tic = stats.lap('emission', tic)
+
+        if len(living) > 0:
+            # --- Update particles ---
+            living.update(dt)
+            tic = stats.lap('update', tic)
+            # --- Check detection (sensor samples in (t, t + dt], only against the sensors of the crossed cells
+            # that the particle has not passed yet) ---
+            start = living.position - living.velocity * dt
+            rows, sens, n, first = grid.samples(start, living.velocity, t, t + dt, not_before=living.emission_time)
+            active = ~grid.has_passed(peak[rows], sens)
+            rows, sens, n, first = rows[active], sens[active], n[active], first[active]
+            if len(rows) > 0:
+                seen[rows] = True
+                keys = living.id[rows] * K + sens
+                slot = np.minimum(np.searchsorted(pair_key, keys), max(len(pair_key) - 1, 0))
+                known = (pair_key[slot] == keys) if len(pair_key) > 0 else np.zeros(len(keys), bool)
+                pair_duration[slot[known]] += n[known] / grid.fs[sens[known]]
+                new = ~known
+                if np.any(new):
+                    pair_key = np.concatenate([pair_key, keys[new]])
+                    pair_time = np.concatenate([pair_time, first[new]])
+                    pair_duration = np.concatenate([pair_duration, (n[new] - 1) / grid.fs[sens[new]]])
+                    pair_position = np.concatenate([pair_position, start[rows[new]] + living.velocity[rows[new]] * (first[new] - t)[:, np.newaxis]])
+                    order = np.argsort(pair_key, kind='stable')
+                    pair_key, pair_time, pair_duration, pair_position = pair_key[order], pair_time[order], pair_duration[order], pair_position[order]
+            tic = stats.lap('detection', tic)
+            # --- Sort out the pairs whose sensor has been passed, remove the particles that passed every sensor ---
+            peak = np.maximum(peak, living.position)
+            if len(pair_key) > 0:
+                done = grid.has_passed(peak[np.searchsorted(living.id, pair_key // K)], pair_key % K)
+                if np.any(done):
+                    release(done)
+            exiting = grid.is_beyond(peak)
+            if np.any(exiting):
+                lost_particles.extend(living.id[exiting & ~seen].tolist())
+                living.keep(~exiting)
+                peak, seen = peak[~exiting], seen[~exiting]
+                if skip_idle:
+                    beyond = beyond[~exiting]
+            tic = stats.lap('culling', tic)
+
+        # Advance simulation time
+        step += 1
+        stats.processed_steps += 1
+        stats.set_living(len(living))
+        if skip_idle and step >= recheck:
+            # pairs of removed particles or passed sensors : no more events
+            r = np.minimum(np.searchsorted(living.id, event_id), max(len(living) - 1, 0))
+            keep = (living.id[r] == event_id) if len(living) > 0 else np.zeros(len(event_id), bool)
+            keep[keep] = ~grid.has_passed(peak[r[keep]], event_sensor[keep])
+            event_id, event_sensor, events = event_id[keep], event_sensor[keep], events[keep]
+            removal = np.stack([np.full(len(beyond), np.inf), np.full(len(beyond), -np.inf), beyond], axis=1)
+            busy, recheck = _next_busy_step(np.concatenate([events, removal]), schedule, next_emission, step_times, step, dt)
+            for _ in range(busy - step):  # idle steps : plain motion
+                living.update(dt)
+            peak = np.maximum(peak, living.position)
+            stats.skipped_steps += busy - step
+            step = busy
+            stats.lap('idle', tic)
+        stats.step, stats.t = step, step_times[step]
+        if progress is not None:
+            progress(stats)
+
+    # Final detection
+    release(np.ones(len(pair_key), bool))
+    lost_particles.extend(living.id[~seen].tolist())
+
+    # one record per sensor
+    records = []
+    sensor_of = np.concatenate([c[0] for c in detected_chunks]) if detected_chunks else np.empty(0, np.int64)
+    all_records = np.concatenate([c[1] for c in detected_chunks]) if detected_chunks else np.empty(0, DETECTION_RECORD_DTYPE)
+    for k in range(K):
+        records.append(all_records[sensor_of == k])
+    return records, lost_particles, [next_emission - len(r) for r in records]
+
+
+####################################################################################################
+
+def _run_analytic(schedule: Tuple[np.ndarray, np.ndarray, np.ndarray],
+                  sensor: RectangularSensor,
+                  run_duration: float,
+                  ids: np.ndarray = None,
+                  stats: RunStats = None,
+                  exact: bool = False
+                  ) -> Tuple[np.ndarray, List[int]]:
+    """
+    Event-driven version of `run`: O(emitted particles) instead of O(steps x living particles).
+    Particles move in straight lines, so each detection record follows from the ray/box intersection.
+    exact=True keeps the continuous crossing (real entry time, exit - entry) instead of sampling it at k/fs.
+    Returns (detection_record, lost_particle_ids), both in emission order.
+    """
+    stats = RunStats() if stats is None else stats
+    tic = time.perf_counter()
+    emission_times, positions, velocities = schedule
+    if ids is None:
+        ids = np.arange(len(emission_times))
+    stats.emissions += len(emission_times)
+    tic = stats.lap('emission', tic)
+
+    # --- Exact sensor crossings, cut at the culling time (the stepping engines remove a particle once it has
+    # passed a max corner of the sensor, e.g. emitted above it, and it can no longer be detected) ---
+    t_enter, t_exit = sensor.crossing_times(positions, velocities)
+    cull_time = emission_times + sensor.beyond_times(positions, velocities)
+    exit_time = np.minimum(emission_times + t_exit, cull_time)
+    end_time = np.minimum(cull_time, run_duration)  # position of the record : at culling, or at the end of the run
+    if exact:
+        entry_time = emission_times + np.maximum(t_enter, 0.0)  # a particle emitted inside is detected at emission
+        is_detected = (exit_time >= entry_time) & (entry_time < run_duration)
+        detection_time = np.where(is_detected, entry_time, emission_times)
+        detection_duration = np.where(is_detected, np.minimum(exit_time, run_duration) - entry_time, 0.0)
+    else:
+        # sampled on the sensor timeline k/fs in (0, run_duration]
+        n_samples, first_sample = sample_ticks(np.maximum(emission_times + t_enter, emission_times), exit_time,
+                                               0.0, run_duration, sensor.fs)
+        is_detected = n_samples > 0
+        detection_time = np.where(is_detected, first_sample, emission_times)
+        detection_duration = np.where(is_detected, (n_samples - 1) / sensor.fs, 0.0)
+    detection_position = positions + velocities * (detection_time - emission_times)[:, np.newaxis]
+    final_position = positions + velocities * (end_time - emission_times)[:, np.newaxis]
+
+    record = np.empty(int(np.count_nonzero(is_detected)), dtype=DETECTION_RECORD_DTYPE)
+    record['id'] = ids[is_detected]
+    record['emission_time'] = emission_times[is_detected]
+    record['detection_time'] = detection_time[is_detected]
+    record['detection_duration'] = detection_duration[is_detected]
+    record['position'] = final_position[is_detected]
+    record['velocity'] = velocities[is_detected]
+    record['detection_position'] = detection_position[is_detected]
+    lost_particles = ids[~is_detected].tolist()
+    stats.detections += len(record)
+    stats.lap('detection', tic)
+    return record, lost_particles
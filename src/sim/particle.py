@@ -8,10 +8,13 @@ class Particle:
     
     id_counter = 0 # facilate unique ID assignment. maybe not a good idea in this context but suficient for small scale simulation.
 
-    def __init__(self, position, velocity):    
+    def __init__(self, position, velocity, id=None):    
         # unique ID : 
-        self.id = Particle.id_counter
-        Particle.id_counter += 1
+        if id is None:
+            self.id = Particle.id_counter
+            Particle.id_counter += 1
+        else:
+            self.id = int(id)  # given by the engine (emission index in the run)
         # geometrical properties :
         self.position = np.array(position, float)[np.newaxis, :]  # (x, y, z)
         self.velocity = np.array(velocity, float)[np.newaxis, :]  # (x, y, z)
@@ -30,3 +33,169 @@ class Particle:
     def update(self, dt):
         # --- update position ---
         self.position += self.velocity * dt
+
+####################################################################################################
+
+# Columnar detection record : one row per detected particle (compact, picklable, column-wise estimators)
+DETECTION_RECORD_DTYPE = np.dtype([
+    ('id', np.int64),
+    ('emission_time', float),
+    ('detection_time', float),
+    ('detection_duration', float),
+    ('position', float, (3,)),  # last simulated position
+    ('velocity', float, (3,)),
+    ('detection_position', float, (3,)),  # position at detection
+])
+
+
+def particles_to_record(particles) -> np.ndarray:
+    """Columnar record (DETECTION_RECORD_DTYPE) of a list of detected Particle objects."""
+    record = np.zeros(len(particles), dtype=DETECTION_RECORD_DTYPE)
+    for i, p in enumerate(particles):
+        record[i] = (p.id,
+                     np.nan if p.emission_time is None else p.emission_time,
+                     np.nan if p.detection_time is None else p.detection_time,
+                     p.detection_duration,
+                     p.position[0],
+                     p.velocity[0],
+                     np.full(3, np.nan) if p.detection_position is None else p.detection_position[0])
+    return record
+
+
+def record_to_particles(record: np.ndarray) -> list:
+    """Detected Particle objects of a columnar record (inverse of `particles_to_record`)."""
+    out = []
+    for row in record:
+        p = Particle(row['position'], row['velocity'], id=row['id'])
+        p.emission_time = float(row['emission_time'])
+        p.detection_is_detected = True
+        p.detection_time = float(row['detection_time'])
+        p.detection_duration = float(row['detection_duration'])
+        p.detection_position = np.array(row['detection_position'], float)[np.newaxis, :]
+        p.detection_velocity = p.velocity
+        out.append(p)
+    return out
+
+####################################################################################################
+
+class ParticleArray:
+    """
+    Struct-of-arrays container for the living particles of a simulation.
+    Each row i of the arrays describes one particle; rows are kept in emission order.
+    ####################################################################################################
+    """
+
+    def __init__(self, capacity: int = 64):
+        capacity = max(1, int(capacity))
+        self.size = 0  # number of living particles (rows in use)
+        # geometrical properties :
+        self._position = np.empty((capacity, 3), float)
+        self._velocity = np.empty((capacity, 3), float)
+        # Dectection properties :
+        self._is_detected = np.zeros(capacity, bool)
+        self._detection_time = np.full(capacity, np.nan)
+        self._detection_position = np.full((capacity, 3), np.nan)
+        self._detection_duration = np.zeros(capacity, float)
+        # Other properties :
+        self._emission_time = np.full(capacity, np.nan)
+        self._id = np.empty(capacity, int)
+
+    def __len__(self):
+        return self.size
+
+    # views on the living rows - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    @property
+    def position(self) -> np.ndarray:
+        return self._position[:self.size]
+
+    @property
+    def velocity(self) -> np.ndarray:
+        return self._velocity[:self.size]
+
+    @property
+    def is_detected(self) -> np.ndarray:
+        return self._is_detected[:self.size]
+
+    @property
+    def detection_time(self) -> np.ndarray:
+        return self._detection_time[:self.size]
+
+    @property
+    def detection_position(self) -> np.ndarray:
+        return self._detection_position[:self.size]
+
+    @property
+    def detection_duration(self) -> np.ndarray:
+        return self._detection_duration[:self.size]
+
+    @property
+    def emission_time(self) -> np.ndarray:
+        return self._emission_time[:self.size]
+
+    @property
+    def id(self) -> np.ndarray:
+        return self._id[:self.size]
+
+    # storage - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def _grow(self, min_capacity: int):
+        capacity = max(min_capacity, 2 * len(self._id))
+        for name in ('_position', '_velocity', '_is_detected', '_detection_time',
+                     '_detection_position', '_detection_duration', '_emission_time', '_id'):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def extend(self, ids: np.ndarray, positions: np.ndarray, velocities: np.ndarray, emission_times: np.ndarray):
+        """Add freshly emitted particles as new rows (not yet detected)."""
+        n = len(ids)
+        if n == 0:
+            return
+        if self.size + n > len(self._id):
+            self._grow(self.size + n)
+        rows = slice(self.size, self.size + n)
+        self._id[rows] = ids
+        self._position[rows] = positions
+        self._velocity[rows] = velocities
+        self._is_detected[rows] = False
+        self._detection_time[rows] = np.nan
+        self._detection_position[rows] = np.nan
+        self._detection_duration[rows] = 0.0
+        self._emission_time[rows] = emission_times
+        self.size += n
+
+    def keep(self, mask: np.ndarray):
+        """Compact the arrays, keeping only the rows where mask is True (order preserved)."""
+        n = int(np.count_nonzero(mask))
+        if n == self.size:
+            return
+        for name in ('_position', '_velocity', '_is_detected', '_detection_time',
+                     '_detection_position', '_detection_duration', '_emission_time', '_id'):
+            arr = getattr(self, name)
+            arr[:n] = arr[:self.size][mask]
+        self.size = n
+
+    def to_record(self, mask: np.ndarray = None) -> np.ndarray:
+        """Columnar record (DETECTION_RECORD_DTYPE) of the selected rows (emission order)."""
+        idx = np.arange(self.size) if mask is None else np.flatnonzero(mask)
+        record = np.empty(len(idx), dtype=DETECTION_RECORD_DTYPE)
+        record['id'] = self._id[idx]
+        record['emission_time'] = self._emission_time[idx]
+        record['detection_time'] = self._detection_time[idx]
+        record['detection_duration'] = self._detection_duration[idx]
+        record['position'] = self._position[idx]
+        record['velocity'] = self._velocity[idx]
+        record['detection_position'] = self._detection_position[idx]
+        return record
+
+    def to_particles(self, mask: np.ndarray = None) -> list:
+        """Build the Particle objects of the selected (detected) rows (emission order)."""
+        return record_to_particles(self.to_record(mask))
+
+    # dynamics - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def update(self, dt):
+        # --- update all positions at once ---
+        self.position[...] += self.velocity * dt
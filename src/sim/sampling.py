@@ -0,0 +1,55 @@
+####################################################################################################
+
+# Imports
+from . import *
+
+####################################################################################################
+
+class InverseCDF:
+    """
+    Inverse CDF of a frozen SciPy distribution, compiled once so that drawing n values is one
+    vectorized evaluation on n uniforms instead of a generic rvs() call.
+
+    Distributions with a closed-form inverse (uniform, expon) are exact. Other continuous distributions
+    are tabulated : ppf is evaluated on `table_size` probabilities clustered towards both tails and draws
+    are linear interpolations in that table. The cell of a probability follows from the spacing in
+    closed form, so a lookup needs no search.
+    """
+
+    def __init__(self, distribution, table_size: int = 2048):
+        if isinstance(distribution.dist, stats.rv_discrete):
+            raise ValueError("InverseCDF only handles continuous distributions.")
+        self.distribution = distribution
+        self.name = distribution.dist.name
+        self.table_size = int(table_size)
+        self._closed_form = None
+        if self.name == 'uniform':
+            low, high = distribution.ppf(0.0), distribution.ppf(1.0)
+            self._closed_form = lambda u: low + (high - low) * u
+        elif self.name == 'expon':
+            loc, scale = distribution.ppf(0.0), distribution.mean() - distribution.ppf(0.0)
+            self._closed_form = lambda u: loc - scale * np.log1p(-u)
+        else:
+            if self.table_size < 4:
+                raise ValueError("table_size must be at least 4.")
+            # probabilities clustered at both ends (cosine spacing), ends pulled inside (0, 1) so ppf stays finite
+            p = 0.5 * (1 - np.cos(np.pi * np.arange(self.table_size) / (self.table_size - 1)))
+            p[0], p[-1] = p[1] * 1e-3, 1 - (1 - p[-2]) * 1e-3
+            self.p = p
+            self.x = np.asarray(distribution.ppf(p), float)
+
+    def __call__(self, u):
+        """Quantiles of the uniforms u (any shape)."""
+        if self._closed_form is not None:
+            return self._closed_form(u)
+        u = np.asarray(u, float)
+        n = self.table_size
+        k = np.clip((np.arccos(1 - 2 * u) * ((n - 1) / np.pi)).astype(np.int64), 0, n - 2)  # inverse of the spacing
+        p_low = self.p[k]
+        frac = np.clip((u - p_low) / (self.p[k + 1] - p_low), 0.0, 1.0)
+        x_low = self.x[k]
+        return x_low + frac * (self.x[k + 1] - x_low)
+
+    def rvs(self, size=None, rng=np.random):
+        """Draw from the distribution with the uniforms of `rng` (np.random.Generator or the np.random module)."""
+        return self(rng.random(size))
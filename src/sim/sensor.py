@@ -3,7 +3,56 @@
 from . import *
 
 from typing import List , Tuple ,Union
-from .particle import Particle
+from .particle import Particle, ParticleArray
+
+####################################################################################################################################################################
+
+def rotation_to(direction: np.ndarray, atol: float = 1e-12) -> Union[np.ndarray, None]:
+    """
+    Rotation matrix taking the z axis onto the unit vector `direction` (Rodrigues formula, as in
+    old/capteur.Sensor). Returns None when direction is +z, i.e. when no rotation is needed.
+    """
+    z_axis = np.array([0.0, 0.0, 1.0])
+    v = np.cross(z_axis, direction)
+    s = np.linalg.norm(v)
+    c = np.dot(z_axis, direction)
+    if s <= atol:
+        # parallel or anti-parallel
+        return None if c > 0 else np.diag([1.0, -1.0, -1.0])
+    vx = np.array([[0, -v[2], v[1]],
+                   [v[2], 0, -v[0]],
+                   [-v[1], v[0], 0]])
+    return np.eye(3) + vx + (vx @ vx) * ((1 - c) / (s**2))
+
+def slab_crossing(positions: np.ndarray, velocities: np.ndarray, lower: np.ndarray, upper: np.ndarray,
+                  min_speed_tol: float = 1e-12) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Entry / exit times of straight trajectories p(t) = p + v*t through the axis-aligned boxes [lower, upper]
+    (slab method; lower and upper broadcast against the (N, 3) positions). Returns (t_enter, t_exit), each (N,).
+    """
+    parallel = np.abs(velocities) < min_speed_tol
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t1 = (lower - positions) / velocities
+        t2 = (upper - positions) / velocities
+    t_axis_enter = np.minimum(t1, t2)
+    t_axis_exit = np.maximum(t1, t2)
+    # Ray parallel to a slab: no constraint if inside the slab, no intersection otherwise
+    inside_slab = (positions >= lower) & (positions <= upper)
+    t_axis_enter = np.where(parallel, np.where(inside_slab, -np.inf, np.inf), t_axis_enter)
+    t_axis_exit = np.where(parallel, np.where(inside_slab, np.inf, -np.inf), t_axis_exit)
+    return np.max(t_axis_enter, axis=1), np.min(t_axis_exit, axis=1)
+
+
+def sample_ticks(t_enter: np.ndarray, t_exit: np.ndarray, t0: float, t1: float, fs: Union[float, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sensor samples k/fs falling in (t0, t1] and in [t_enter, t_exit] (absolute times).
+    Returns (n_samples, first_sample_time), each (N,). Consecutive intervals (t0, t1], (t1, t2], ... never
+    share a sample, so counts can be accumulated step after step.
+    """
+    k_first = np.maximum(np.ceil(t_enter * fs), np.floor(t0 * fs) + 1)
+    k_last = np.minimum(np.floor(t_exit * fs), np.floor(t1 * fs))
+    n_samples = np.maximum(k_last - k_first + 1, 0).astype(np.int64)
+    return n_samples, k_first / fs
 
 ####################################################################################################################################################################
 
@@ -15,27 +64,116 @@ class RectangularSensor:
     def __init__(self,
                  pos: Tuple[float, float, float],  # (x, y, z) : center position
                  dimensions: Tuple[float, float, float],  # (width, depth, height)
-                 fs = 1000.0 # smapling frequency
+                 fs = 1000.0, # smapling frequency
+                 direction: Tuple[float, float, float] = (0.0, 0.0, 1.0)  # height (thickness) axis of the box
                  ):
         
         self.position = np.array(pos, float)[np.newaxis, :]  # (x, y, z)
         self.dimensions = np.array(dimensions, float)  # (width, depth, height)
         self.fs = fs  # sampling frequency
+        self.direction = np.array(direction, float)
+        self.direction /= np.linalg.norm(self.direction)
+        # cached geometry (the sensor does not move during a run)
+        self._half_dims = self.dimensions[np.newaxis, :] / 2.0  # (1, 3), in the local frame
+        self._rotation = rotation_to(self.direction)  # local -> world, None for an axis-aligned box
+        if self._rotation is None:
+            self._world_half_dims = self._half_dims
+        else:  # half extents of the world axis-aligned bounding box of the tilted box
+            self._world_half_dims = self._half_dims @ np.abs(self._rotation).T
+        self._upper_bounds = self.position + self._world_half_dims  # (1, 3)
+        self._upper_bounds.flags.writeable = False  # shared by get_range_detect_bounds
     
     def get_range_detect_bounds(self) -> np.ndarray:
-        """Returns the max corners of the sensor detection volume according to the basis (x,y,z) and not the local sensor frame."""
-        return self.position + self.dimensions[np.newaxis, :] / 2.0
+        """Returns the max corners of the sensor detection volume according to the basis (x,y,z) and not the local sensor frame (read-only)."""
+        return self._upper_bounds
+
+    def to_local(self, positions: np.ndarray) -> np.ndarray:
+        """(N, 3) world positions -> sensor frame (centered, x=width, y=depth, z=height), one (N,3)@(3,3) product."""
+        relative = positions - self.position
+        if self._rotation is None:
+            return relative
+        return relative @ self._rotation  # rows of R.T @ (p - T)
+
+    def contains(self, positions: np.ndarray) -> np.ndarray:
+        """Vectorized inside test for an (N, 3) array of positions. Returns an (N,) bool array."""
+        return np.all(np.abs(self.to_local(positions)) <= self._half_dims, axis=1)
+
+    def is_beyond(self, positions: np.ndarray) -> np.ndarray:
+        """Vectorized test of the culling rule: True where a position has passed a max corner of the sensor (bounding box)."""
+        return np.any(positions >= self._upper_bounds, axis=1)
+
+    def beyond_times(self, positions: np.ndarray, velocities: np.ndarray) -> np.ndarray:
+        """Time after which straight trajectories p + v*t meet the culling rule (0 if they already do, inf if never)."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.where(velocities > 0, (self._upper_bounds - positions) / velocities, np.inf)
+        t = np.where(positions >= self._upper_bounds, 0.0, t)
+        return np.min(t, axis=1)
+
+    def crossing_times(self, positions: np.ndarray, velocities: np.ndarray, min_speed_tol: float = 1e-12) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Closed-form entry / exit times of straight trajectories p(t) = p + v*t through the sensor box
+        (slab method, as in old StaticAnalysis.estimate_residence_times), for (N, 3) arrays at once.
+        Returns (t_enter, t_exit), each of shape (N,). A trajectory misses the box when t_enter > t_exit.
+        Tilted boxes are handled in the sensor frame.
+        """
+        positions = np.atleast_2d(np.asarray(positions, float))
+        velocities = np.atleast_2d(np.asarray(velocities, float))
+        if self._rotation is None:
+            lower = self.position - self._half_dims
+            upper = self._upper_bounds
+        else:
+            positions = self.to_local(positions)
+            velocities = velocities @ self._rotation
+            lower = -self._half_dims
+            upper = self._half_dims
+        return slab_crossing(positions, velocities, lower, upper, min_speed_tol)
+
+    def samples(self, positions: np.ndarray, velocities: np.ndarray, t0: float, t1: float,
+                not_before: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Samples of the sensor (times k/fs) in (t0, t1] at which the straight trajectories p(t) = p + v*(t - t0)
+        of (N, 3) arrays are inside the box, i.e. the sensor timeline interpolated between two simulation
+        steps. Trajectories are ignored before `not_before` (emission times) when given.
+        Returns (n_samples, first_sample_time), each of shape (N,).
+        """
+        t_enter, t_exit = self.crossing_times(positions, velocities)
+        t_enter = t0 + t_enter
+        if not_before is not None:
+            t_enter = np.maximum(t_enter, not_before)
+        return sample_ticks(t_enter, t0 + t_exit, t0, t1, self.fs)
 
     # update on particle array ------------------------------------------------------------------------------------------------
 
-    def update(self , particles : Union[List[Particle], Particle] , t : float) -> None:
+    def update(self , particles : Union[List[Particle], Particle] , t : float, dt : float = None) -> None:
+        """
+        Detection rule, called after the particles moved from t to t + dt.
+        dt=None : one sample per call, at t, on the current position (durations are then in simulation steps).
+        dt given : the sensor samples on its own fs timeline, in (t, t + dt], along the interpolated trajectory.
+        """
         if isinstance(particles, Particle):
             particles = [particles]
+        if dt is not None:
+            if len(particles) == 0:
+                return
+            # one vectorized crossing for the whole list, Python work only for the particles with samples
+            velocities = np.concatenate([p.velocity for p in particles])
+            starts = np.concatenate([p.position for p in particles]) - velocities * dt
+            not_before = np.array([-np.inf if p.emission_time is None else p.emission_time for p in particles])
+            n_samples, first_samples = self.samples(starts, velocities, t, t + dt, not_before=not_before)
+            for i in np.flatnonzero(n_samples):
+                particle = particles[i]
+                n, first = int(n_samples[i]), float(first_samples[i])
+                if not particle.detection_is_detected:
+                    particle.detection_is_detected = True
+                    particle.detection_time = first
+                    particle.detection_position = starts[i:i+1] + particle.velocity * (first - t)
+                    particle.detection_velocity = particle.velocity
+                    n -= 1
+                particle.detection_duration += n / self.fs
+            return
         for particle in particles:
             # check if particle is inside the sensor volume
-            relative_pos = particle.position - self.position  # (1, 3)
-            half_dims = self.dimensions[np.newaxis, :] / 2.0  # (1, 3)
-            if np.all(np.abs(relative_pos) <= half_dims):
+            if self.contains(particle.position)[0]:
                 if not particle.detection_is_detected:
                     particle.detection_is_detected = True
                     particle.detection_time = t
@@ -43,4 +181,209 @@ class RectangularSensor:
                     particle.detection_velocity = particle.velocity
                 else:
                     particle.detection_duration += 1.0 / self.fs
-        
\ No newline at end of file
+        
+
+    # update on struct-of-arrays ----------------------------------------------------------------------------------------------
+
+    def update_array(self, particles: ParticleArray, t: float, dt: float = None) -> None:
+        """Same rule as `update`, applied to every row of a ParticleArray in one pass."""
+        if dt is not None:
+            start = particles.position - particles.velocity * dt
+            n, first = self.samples(start, particles.velocity, t, t + dt, not_before=particles.emission_time)
+            seen = n > 0
+            first_seen = seen & ~particles.is_detected
+            particles.is_detected[first_seen] = True
+            particles.detection_time[first_seen] = first[first_seen]
+            particles.detection_position[first_seen] = start[first_seen] + particles.velocity[first_seen] * (first[first_seen] - t)[:, np.newaxis]
+            particles.detection_duration[seen] += (n[seen] - first_seen[seen]) / self.fs
+            return
+        inside = self.contains(particles.position)
+        first = inside & ~particles.is_detected
+        again = inside & particles.is_detected
+        particles.is_detected[first] = True
+        particles.detection_time[first] = t
+        particles.detection_position[first] = particles.position[first]
+        particles.detection_duration[again] += 1.0 / self.fs
+
+####################################################################################################################################################################
+
+class SensorGrid:
+    """
+    Uniform-grid spatial index over the boxes (bounding boxes for tilted ones) of several RectangularSensor.
+    Each occupied cell lists the sensors overlapping it (CSR layout over the sorted occupied cells only,
+    so memory is O(sensors) whatever the spacing between them). A position is only tested against the
+    sensors of its own cell.
+    The culling rule is kept per sensor (`has_passed`), so each sensor behaves as if it were alone.
+    With at most DENSE_MAX_SENSORS sensors, `samples` tests every (position, sensor) pair directly : the
+    cell lookups would cost more than the crossings they save.
+    """
+
+    DENSE_MAX_SENSORS = 16
+
+    def __init__(self, sensors: List[RectangularSensor], cell_size: Union[float, np.ndarray] = None):
+        if len(sensors) == 0:
+            raise ValueError("SensorGrid needs at least one sensor.")
+        self.sensors = list(sensors)
+        self.centers = np.concatenate([s.position for s in self.sensors], axis=0)  # (K, 3)
+        self.half_dims = np.concatenate([s._half_dims for s in self.sensors], axis=0)  # (K, 3), local frames
+        self.fs = np.array([s.fs for s in self.sensors], float)  # (K,)
+        # local -> world rotations of the tilted sensors (identity for the axis-aligned ones)
+        self.rotations = np.stack([np.eye(3) if s._rotation is None else s._rotation for s in self.sensors])  # (K, 3, 3)
+        self.is_tilted = np.array([s._rotation is not None for s in self.sensors])  # (K,)
+        world_half_dims = np.concatenate([s._world_half_dims for s in self.sensors], axis=0)  # bounding boxes
+        lower = self.centers - world_half_dims
+        upper = np.concatenate([s._upper_bounds for s in self.sensors], axis=0)
+        self.lower_bounds = lower  # (K, 3), same values as RectangularSensor.crossing_times for axis-aligned boxes
+        self.upper_bounds = upper  # (K, 3), max corners of the culling rule of every sensor
+        # passing a max corner that dominates another one (>= on every axis) implies passing that one too,
+        # so "passed every sensor" only needs the non-dominated corners
+        self.outer_bounds = upper[[k for k in range(len(upper))
+                                   if not np.any(np.all(upper >= upper[k], axis=1) & np.any(upper > upper[k], axis=1))]]
+
+        # cell size : by default the largest sensor extent per axis, so a box spans at most 2 cells per axis
+        if cell_size is None:
+            cell_size = np.max(upper - lower, axis=0)
+        self.cell_size = np.maximum(np.broadcast_to(np.asarray(cell_size, float), (3,)), 1e-12)
+        self.origin = np.min(lower, axis=0)
+        self.shape = np.floor((np.max(upper, axis=0) - self.origin) / self.cell_size).astype(np.int64) + 1
+
+        # (cell, sensor) pairs for every cell overlapped by every box
+        cell_lo = self._cell_index(lower)
+        cell_hi = self._cell_index(upper)
+        keys, owners = [], []
+        for k in range(len(self.sensors)):
+            ranges = [np.arange(cell_lo[k, a], cell_hi[k, a] + 1) for a in range(3)]
+            cells = np.stack(np.meshgrid(*ranges, indexing='ij'), axis=-1).reshape(-1, 3)
+            keys.append(self._flat(cells))
+            owners.append(np.full(len(cells), k))
+        keys, owners = np.concatenate(keys), np.concatenate(owners)
+        order = np.argsort(keys, kind='stable')
+        keys, self.cell_sensors = keys[order], owners[order]
+        self.cell_keys, self.cell_start = np.unique(keys, return_index=True)
+        self.cell_stop = np.append(self.cell_start[1:], len(keys))
+
+    def __len__(self):
+        return len(self.sensors)
+
+    def _cell_index(self, positions: np.ndarray) -> np.ndarray:
+        return np.floor((positions - self.origin) / self.cell_size).astype(np.int64)
+
+    def _flat(self, cells: np.ndarray) -> np.ndarray:
+        return (cells[:, 0] * self.shape[1] + cells[:, 1]) * self.shape[2] + cells[:, 2]
+
+    def candidates(self, positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(rows, sensors) pairs : sensors sharing a grid cell with each position of an (N, 3) array."""
+        return self._cell_candidates(self._cell_index(positions))
+
+    def _cell_candidates(self, cells: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        in_grid = np.all((cells >= 0) & (cells < self.shape), axis=1)
+        rows = np.flatnonzero(in_grid)
+        keys = self._flat(cells[in_grid])
+        slot = np.searchsorted(self.cell_keys, keys)
+        slot = np.minimum(slot, len(self.cell_keys) - 1)
+        occupied = self.cell_keys[slot] == keys
+        rows, slot = rows[occupied], slot[occupied]
+
+        # expand each row over its cell's sensor list
+        counts = self.cell_stop[slot] - self.cell_start[slot]
+        pair_rows = np.repeat(rows, counts)
+        offsets = np.arange(len(pair_rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+        pair_sensors = self.cell_sensors[np.repeat(self.cell_start[slot], counts) + offsets]
+        return pair_rows, pair_sensors
+
+    def samples(self, positions: np.ndarray, velocities: np.ndarray, t0: float, t1: float,
+                not_before: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        `RectangularSensor.samples` for every sensor : trajectories start at `positions` at t0 and end at t1.
+        Segments are matched with the sensors of every cell of the cell range spanned by their end points
+        (clipped to the grid), so a step may cross any number of cells.
+        Returns (rows, sensors, n_samples, first_sample_time) for the pairs with at least one sample.
+        """
+        if len(self) <= self.DENSE_MAX_SENSORS:
+            rows, sensors = np.repeat(np.arange(len(positions)), len(self)), np.tile(np.arange(len(self)), len(positions))
+        else:
+            rows, sensors = self._segment_candidates(positions, velocities * (t1 - t0))
+        t_enter, t_exit = self._pair_crossing(positions[rows], velocities[rows], sensors)
+        t_enter = t0 + t_enter
+        if not_before is not None:
+            t_enter = np.maximum(t_enter, not_before[rows])
+        n, first = sample_ticks(t_enter, t0 + t_exit, t0, t1, self.fs[sensors])
+        seen = n > 0
+        return rows[seen], sensors[seen], n[seen], first[seen]
+
+    def _segment_candidates(self, positions: np.ndarray, displacements: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(rows, sensors) pairs : sensors of every cell of the cell range of each segment, without duplicates."""
+        cells_start = self._cell_index(positions)
+        cells_end = self._cell_index(positions + displacements)
+        cell_lo = np.maximum(np.minimum(cells_start, cells_end), 0)
+        cell_hi = np.minimum(np.maximum(cells_start, cells_end), self.shape - 1)
+        span = np.maximum(cell_hi - cell_lo + 1, 0)  # (N, 3) cells per axis, 0 when outside the grid
+        counts = np.prod(span, axis=1)
+        # one (row, cell) pair per cell of each range
+        cell_rows = np.repeat(np.arange(len(positions)), counts)
+        offsets = np.arange(len(cell_rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+        span = span[cell_rows]
+        cells = cell_lo[cell_rows] + np.stack([offsets // (span[:, 1] * span[:, 2]),
+                                               (offsets // span[:, 2]) % span[:, 1],
+                                               offsets % span[:, 2]], axis=1)
+        pair_rows, sensors = self._cell_candidates(cells)
+        keys = np.unique(cell_rows[pair_rows] * len(self) + sensors)  # a sensor may overlap several cells of a range
+        return keys // len(self), keys % len(self)
+
+    def _pair_crossing(self, positions: np.ndarray, velocities: np.ndarray, sensors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (t_enter, t_exit) of the trajectory of each row through the box of `sensors` (same row count), computed as
+        RectangularSensor.crossing_times does : world frame for axis-aligned boxes, sensor frame for tilted ones.
+        """
+        positions = positions.copy()
+        velocities = velocities.copy()
+        lower = self.lower_bounds[sensors]
+        upper = self.upper_bounds[sensors]
+        tilted = self.is_tilted[sensors]
+        if np.any(tilted):
+            positions[tilted] = np.einsum('ni,nij->nj', positions[tilted] - self.centers[sensors[tilted]], self.rotations[sensors[tilted]])
+            velocities[tilted] = np.einsum('ni,nij->nj', velocities[tilted], self.rotations[sensors[tilted]])
+            lower[tilted] = -self.half_dims[sensors[tilted]]
+            upper[tilted] = self.half_dims[sensors[tilted]]
+        return slab_crossing(positions, velocities, lower, upper)
+
+    def trajectory_candidates(self, positions: np.ndarray, velocities: np.ndarray, duration: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (rows, sensors) pairs : sensors of the cells crossed by the trajectories p + v*t, 0 <= t <= duration.
+        Each trajectory is first clipped to the grid box, so only the cell range of the part inside the grid counts.
+        """
+        t_in, t_out = slab_crossing(positions, velocities, self.origin, np.max(self.upper_bounds, axis=0))
+        t_in, t_out = np.maximum(t_in, 0.0), np.minimum(t_out, duration)
+        crossing = np.flatnonzero(t_in <= t_out)
+        start = positions[crossing] + velocities[crossing] * t_in[crossing, np.newaxis]
+        rows, sensors = self._segment_candidates(start, velocities[crossing] * (t_out - t_in)[crossing, np.newaxis])
+        return crossing[rows], sensors
+
+    def crossing_times(self, positions: np.ndarray, velocities: np.ndarray, sensors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """`RectangularSensor.crossing_times` for (position, sensor) pairs : (t_enter, t_exit), each (N,)."""
+        return self._pair_crossing(positions, velocities, sensors)
+
+    def beyond_times(self, positions: np.ndarray, velocities: np.ndarray, sensors: np.ndarray) -> np.ndarray:
+        """`RectangularSensor.beyond_times` for (position, sensor) pairs, (N,)."""
+        return self._corner_times(positions, velocities, self.upper_bounds[sensors])
+
+    def beyond_all_times(self, positions: np.ndarray, velocities: np.ndarray) -> np.ndarray:
+        """Time after which straight trajectories meet `is_beyond` (passed every outer corner), (N,)."""
+        positions, velocities = positions[:, np.newaxis, :], velocities[:, np.newaxis, :]
+        return np.max(self._corner_times(positions, velocities, self.outer_bounds), axis=1)
+
+    @staticmethod
+    def _corner_times(positions: np.ndarray, velocities: np.ndarray, corners: np.ndarray) -> np.ndarray:
+        """Time after which p + v*t is >= a max corner on some axis (0 if already, inf if never); reduces the last axis."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.where(velocities > 0, (corners - positions) / velocities, np.inf)
+        t = np.where(positions >= corners, 0.0, t)
+        return np.min(t, axis=-1)
+
+    def has_passed(self, positions: np.ndarray, sensors: np.ndarray) -> np.ndarray:
+        """Culling rule of RectangularSensor.is_beyond for (position, sensor) pairs, (N, 3) and (N,) arrays."""
+        return np.any(positions >= self.upper_bounds[sensors], axis=1)
+
+    def is_beyond(self, positions: np.ndarray) -> np.ndarray:
+        """Culling rule for the whole array : True where a position has passed (a max corner of) every sensor."""
+        return np.all(np.any(positions[:, np.newaxis, :] >= self.outer_bounds[np.newaxis, :, :], axis=2), axis=1)
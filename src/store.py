@@ -0,0 +1,144 @@
+##################################################################################################################################################################################
+
+import numpy as np
+
+import hashlib
+import json
+import os
+from typing import Iterator, Optional, Tuple
+
+from .sim.particle import DETECTION_RECORD_DTYPE
+
+####################################################################################################################################################################################
+
+def params_hash(params: dict) -> str:
+    """Stable hash of a sim_params.json-like dict (key order independent)."""
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def seed_to_json(seed) -> Optional[dict]:
+    """JSON description of a run seed (int or np.random.SeedSequence) allowing to re-simulate the run."""
+    if seed is None:
+        return None
+    if isinstance(seed, np.random.SeedSequence):
+        return {'entropy': seed.entropy, 'spawn_key': list(seed.spawn_key)}
+    return {'entropy': int(seed), 'spawn_key': []}
+
+
+def seed_from_json(desc: Optional[dict]) -> Optional[np.random.SeedSequence]:
+    """Inverse of `seed_to_json`: the SeedSequence of a stored run (pass it as gen_seed to re-simulate)."""
+    if desc is None:
+        return None
+    return np.random.SeedSequence(desc['entropy'], spawn_key=tuple(desc['spawn_key']))
+
+####################################################################################################################################################################################
+
+class CampaignStore:
+    """
+    On-disk store of the detection records of a simulation campaign.
+
+    Layout of the directory `path`:
+        index.json         : params, params hash, chunk list and one entry per run (seed, chunk, offset, count, lost)
+        chunk_00000.npy    : concatenated detection records (DETECTION_RECORD_DTYPE) of consecutive runs
+        ...
+    Runs are buffered in memory and written in chunks of about `chunk_rows` detections; a run never spans
+    two chunks. Chunks are reopened with np.load(mmap_mode="r"), so readers only page in what they scan.
+    """
+
+    INDEX = 'index.json'
+
+    def __init__(self, path: str, params: Optional[dict] = None, chunk_rows: int = 1_000_000):
+        self.path = path
+        self.chunk_rows = int(chunk_rows)
+        self._buffer = []  # records not yet written
+        self._buffer_rows = 0
+        self._mmaps = {}  # chunk index -> memory-mapped array
+
+        index_file = os.path.join(path, self.INDEX)
+        if os.path.exists(index_file):
+            with open(index_file, 'r') as f:
+                self.index = json.load(f)
+            if params is not None and params_hash(params) != self.index['params_hash']:
+                raise ValueError(f"Store {path} was written with different simulation parameters.")
+        else:
+            if params is None:
+                raise ValueError(f"No campaign store in {path}; params are required to create one.")
+            os.makedirs(path, exist_ok=True)
+            self.index = {'params_hash': params_hash(params), 'params': params, 'chunks': [], 'runs': []}
+            self._write_index()
+
+    # writing - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def append_run(self, record: np.ndarray, lost: int = 0, seed=None):
+        """Append the detection record of one run (as returned by run(..., as_record=True))."""
+        record = np.asarray(record, dtype=DETECTION_RECORD_DTYPE)
+        self.index['runs'].append({'seed': seed_to_json(seed),
+                                   'chunk': len(self.index['chunks']),
+                                   'offset': self._buffer_rows,
+                                   'count': len(record),
+                                   'lost': int(lost)})
+        self._buffer.append(record)
+        self._buffer_rows += len(record)
+        if self._buffer_rows >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered runs as a new chunk and update the index."""
+        if not self._buffer:
+            return
+        name = f"chunk_{len(self.index['chunks']):05d}.npy"
+        np.save(os.path.join(self.path, name), np.concatenate(self._buffer))
+        self.index['chunks'].append({'file': name, 'rows': self._buffer_rows})
+        self._buffer, self._buffer_rows = [], 0
+        self._write_index()
+
+    def _write_index(self):
+        tmp = os.path.join(self.path, self.INDEX + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp, os.path.join(self.path, self.INDEX))  # atomic: readers never see a partial index
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # reading - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+    def __len__(self):
+        """Number of runs written to disk."""
+        return sum(1 for r in self.index['runs'] if r['chunk'] < len(self.index['chunks']))
+
+    def chunk(self, k: int) -> np.ndarray:
+        """Memory-mapped detection records of chunk k (read-only)."""
+        if k not in self._mmaps:
+            self._mmaps[k] = np.load(os.path.join(self.path, self.index['chunks'][k]['file']), mmap_mode='r')
+        return self._mmaps[k]
+
+    def iter_chunks(self) -> Iterator[np.ndarray]:
+        for k in range(len(self.index['chunks'])):
+            yield self.chunk(k)
+
+    def run(self, i: int) -> Tuple[np.ndarray, int]:
+        """(record, lost_count) of run i, the record being a view on the memory-mapped chunk."""
+        entry = self.index['runs'][i]
+        if entry['chunk'] >= len(self.index['chunks']):
+            raise IndexError(f"Run {i} is not flushed to disk yet.")
+        return self.chunk(entry['chunk'])[entry['offset']:entry['offset'] + entry['count']], entry['lost']
+
+    def iter_runs(self) -> Iterator[Tuple[np.ndarray, int]]:
+        for i in range(len(self)):
+            yield self.run(i)
+
+    def run_ids(self) -> np.ndarray:
+        """Run index of every stored detection, chunk after chunk (aligned with `iter_chunks`)."""
+        runs = [r for r in self.index['runs'] if r['chunk'] < len(self.index['chunks'])]
+        return np.repeat(np.arange(len(runs)), [r['count'] for r in runs])
+
+    @property
+    def params(self) -> dict:
+        return self.index['params']
@@ -0,0 +1,231 @@
+##################################################################################################################################################################################
+
+import numpy as np
+
+import itertools
+import json
+from typing import Callable, Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from .sim.model import run, run_common
+from .sim.generator import GeneratorCircle
+from .campaign import estimate_run
+from .store import params_hash
+
+####################################################################################################################################################################################
+
+# keys whose plain value is already a list : only a list of such lists is a sweep
+VECTOR_KEYS = ('sen_pos', 'sen_dimensions', 'sen_direction')
+
+
+def sweep_values(key: str, value) -> Optional[list]:
+    """
+    Values taken by `key` in a sweep spec, or None when the value is fixed. Swept values are written
+        [v1, v2, ...]                     (for VECTOR_KEYS : [[x, y, z], [x, y, z], ...])
+        {"values": [v1, v2, ...]}
+        {"range": [start, stop, step]}    (np.arange)
+        {"linspace": [start, stop, num]}  (np.linspace)
+    """
+    if isinstance(value, dict) and len(value) == 1 and next(iter(value)) in ('values', 'range', 'linspace'):
+        kind, args = next(iter(value.items()))
+        if kind == 'range':
+            return np.arange(*args).tolist()
+        if kind == 'linspace':
+            return np.linspace(args[0], args[1], int(args[2])).tolist()
+        return list(args)
+    if isinstance(value, list):
+        if key in VECTOR_KEYS and not all(isinstance(v, list) for v in value):
+            return None
+        return list(value)
+    return None
+
+
+def expand_sweep(spec: dict) -> Tuple[List[dict], Dict[str, list]]:
+    """
+    Cartesian product of a sweep spec (a sim_params.json where gen_/sen_ keys may be swept, see `sweep_values`).
+    Returns (configs, axes) : one plain sim_params dict per configuration (last swept key varying fastest)
+    and the values of every swept key.
+    """
+    axes = {}
+    for key, value in spec.items():
+        values = sweep_values(key, value)
+        if values is None:
+            continue
+        if not key.startswith(('gen_', 'sen_')):
+            raise ValueError(f"Only gen_ and sen_ keys can be swept, got '{key}'.")
+        if len(values) == 0:
+            raise ValueError(f"Empty sweep for '{key}'.")
+        axes[key] = values
+    configs = []
+    for combination in itertools.product(*axes.values()):
+        config = dict(spec)
+        config.update(zip(axes.keys(), combination))
+        configs.append(config)
+    return configs, axes
+
+
+def load_sweep(path: str) -> dict:
+    with open(path, 'r') as f:
+        return json.load(f)
+
+####################################################################################################################################################################################
+
+_GENERATORS: Dict[str, GeneratorCircle] = {}  # per-process generators, by hash of their gen_ params
+_MAX_GENERATORS = 256
+
+
+def _generator_for(config: dict) -> GeneratorCircle:
+    """Generator of a configuration, built once per process (frozen SciPy distributions included)."""
+    generator_params = {k[4:]: v for k, v in config.items() if k.startswith('gen_') and k != 'gen_seed'}
+    key = params_hash(generator_params)
+    if key not in _GENERATORS:
+        if len(_GENERATORS) >= _MAX_GENERATORS:
+            _GENERATORS.clear()
+        _GENERATORS[key] = GeneratorCircle(**generator_params)
+    return _GENERATORS[key]
+
+
+def _sweep_task(task: Tuple[int, int, np.random.SeedSequence], configs: List[dict], estimate: Callable, run_kwargs: dict):
+    """One (configuration, replicate) pair : simulate with the cached generator of the configuration, then estimate."""
+    i, _, seed = task
+    config = configs[i]
+    record, lost = run(clock=config.get('clock', 60),
+                       run_duration=config.get('run_duration', 10.0),
+                       visualize=False,
+                       is_progressive=False,
+                       as_record=True,
+                       generator=_generator_for(config),
+                       gen_seed=seed,
+                       **run_kwargs,
+                       **{k: v for k, v in config.items() if k.startswith('sen_')})
+    return estimate(record, lost, config), len(record), lost
+
+
+def _common_task(task: Tuple[int, int, np.random.SeedSequence], configs: List[dict], groups: List[List[int]],
+                 estimate: Callable, run_kwargs: dict) -> list:
+    """One replicate of a group of configurations differing only by sen_ keys : one emission stream for all."""
+    g, _, seed = task
+    members = [configs[i] for i in groups[g]]
+    config = members[0]
+    outputs = run_common(clock=config.get('clock', 60),
+                         run_duration=config.get('run_duration', 10.0),
+                         sensors=[{k[4:]: v for k, v in member.items() if k.startswith('sen_')} for member in members],
+                         generator=_generator_for(config),
+                         gen_seed=seed,
+                         **run_kwargs)
+    return [(estimate(record, lost, member), len(record), lost) for member, (record, lost) in zip(members, outputs)]
+
+
+def run_sweep(spec: dict,
+              nb_run: int,
+              seed: Optional[int] = None,
+              max_workers: Optional[int] = None,
+              estimate: Callable = estimate_run,
+              chunksize: Optional[int] = None,
+              out: Optional[str] = None,
+              common_random_numbers: bool = False,
+              **run_kwargs
+              ) -> np.ndarray:
+    """
+    Parameter sweep : nb_run replicates of every configuration of `spec` (see `expand_sweep`), each followed
+    by `estimate(record, lost_count, config)` returning a dict {name: value}.
+
+    The (configuration, replicate) pairs are spread over a process pool, configuration by configuration
+    (chunksize defaults to nb_run), and every worker builds the generator of a configuration only once.
+    Pair k draws from the k-th child of np.random.SeedSequence(seed), so results do not depend on the
+    number of workers.
+
+    common_random_numbers=True : configurations that only differ by sen_ keys share their emission streams.
+    Each replicate of such a group is simulated once and evaluated against all of its sensor configurations
+    (`run_common`, analytic or vectorized engine), so geometry comparisons are free of emission noise and
+    cost one simulation instead of one per configuration.
+
+    Returns one columnar table (structured array, saved to `out` with np.save when given)
+    with one row per pair : config, replicate, the swept parameters, detected, lost and the estimates.
+    """
+    configs, axes = expand_sweep(spec)
+    if common_random_numbers:
+        return _run_common_sweep(configs, axes, nb_run, seed, max_workers, estimate, chunksize, out, run_kwargs)
+    children = np.random.SeedSequence(seed).spawn(len(configs) * nb_run)
+    tasks = [(i, r, children[i * nb_run + r]) for i in range(len(configs)) for r in range(nb_run)]
+    task = partial(_sweep_task, configs=configs, estimate=estimate, run_kwargs=run_kwargs)
+
+    if max_workers == 1:
+        outputs = list(map(task, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            outputs = list(executor.map(task, tasks, chunksize=chunksize or nb_run))
+
+    table = _sweep_table(tasks, configs, axes, outputs)
+    if out is not None:
+        np.save(out, table)
+    return table
+
+
+def _run_common_sweep(configs: List[dict], axes: Dict[str, list], nb_run: int, seed: Optional[int], max_workers: Optional[int],
+                      estimate: Callable, chunksize: Optional[int], out: Optional[str], run_kwargs: dict) -> np.ndarray:
+    """`run_sweep` with common random numbers across the sensor configurations of each group."""
+    groups = {}
+    for i, config in enumerate(configs):
+        key = params_hash({k: v for k, v in config.items() if not k.startswith('sen_')})
+        groups.setdefault(key, []).append(i)
+    groups = list(groups.values())
+    children = np.random.SeedSequence(seed).spawn(len(groups) * nb_run)
+    group_tasks = [(g, r, children[g * nb_run + r]) for g in range(len(groups)) for r in range(nb_run)]
+    task = partial(_common_task, configs=configs, groups=groups, estimate=estimate, run_kwargs=run_kwargs)
+
+    if max_workers == 1:
+        group_outputs = list(map(task, group_tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            group_outputs = list(executor.map(task, group_tasks, chunksize=chunksize or nb_run))
+
+    # back to one row per (configuration, replicate), in configuration order
+    rows = {}
+    for (g, r, child), outputs in zip(group_tasks, group_outputs):
+        for i, output in zip(groups[g], outputs):
+            rows[(i, r)] = (child, output)
+    tasks = [(i, r, rows[(i, r)][0]) for i in range(len(configs)) for r in range(nb_run)]
+    outputs = [rows[(i, r)][1] for i in range(len(configs)) for r in range(nb_run)]
+    table = _sweep_table(tasks, configs, axes, outputs)
+    if out is not None:
+        np.save(out, table)
+    return table
+
+
+def _sweep_table(tasks: list, configs: List[dict], axes: Dict[str, list], outputs: list) -> np.ndarray:
+    """Columnar results of a sweep, one row per (configuration, replicate) pair."""
+    names = sorted({name for result, _, _ in outputs for name in result})
+    dtype = ([('config', np.int64), ('replicate', np.int64)]
+             + [(key, _column_dtype(values)) for key, values in axes.items()]
+             + [('detected', np.int64), ('lost', np.int64)]
+             + [(name, float) for name in names])
+    table = np.zeros(len(tasks), dtype=dtype)
+    table['config'] = [i for i, _, _ in tasks]
+    table['replicate'] = [r for _, r, _ in tasks]
+    for key in axes:
+        column = [_column_value(configs[i][key]) for i, _, _ in tasks]
+        table[key] = column
+    table['detected'] = [detected for _, detected, _ in outputs]
+    table['lost'] = [lost for _, _, lost in outputs]
+    for name in names:
+        table[name] = [result.get(name, np.nan) for result, _, _ in outputs]
+    return table
+
+
+def _column_dtype(values: list):
+    """Column type of a swept parameter : float, fixed-size float vector, or string (JSON for anything else)."""
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        return float
+    if all(isinstance(v, list) for v in values) and len({len(v) for v in values}) == 1:
+        return (float, (len(values[0]),))
+    return 'U' + str(max(len(_column_value(v)) for v in values))
+
+
+def _column_value(value):
+    if isinstance(value, (int, float, str)) and not isinstance(value, bool):
+        return value
+    if isinstance(value, list) and all(isinstance(v, (int, float)) for v in value):
+        return value
+    return json.dumps(value, sort_keys=True)